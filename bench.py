@@ -0,0 +1,178 @@
+import os
+import gc
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from datetime import datetime, timezone
+from src import clean
+from src.clean import name_cache
+from src.visualize import build_group_index, create_tree, find_overlaps, tree_to_string, write_tree
+from src.synthetic import generate_entries
+from separate import write_overlap_records
+
+# Stages of the original clean chain, in the order normalize_entry fuses them
+clean_steps = ['standardize_abbreviations', 'remove_dates', 'check_parentheses', 'extract_parentheticals',
+               'remove_parentheticals', 'move_lastname', 'extract_name_parts']
+
+
+def _count(value):
+    try:
+        return len(value)
+    except TypeError:
+        return value
+
+
+def measure(results, stage, func, count_in, trace_memory=True, count_out=_count):
+    """
+    Runs one stage and records its wall time, CPU time, peak traced memory and entry counts.
+
+    Args:
+        results (dict): The results of the current corpus size, updated in place.
+        stage (str): The stage name.
+        func (callable): The stage, called without arguments.
+        count_in (int): The number of items going into the stage.
+        trace_memory (bool): Whether to trace the peak memory of the stage with tracemalloc.
+        count_out (callable): Returns the number of items coming out of the stage from its result.
+
+    Returns:
+        The result of func.
+    """
+    gc.collect()
+    if trace_memory:
+        tracemalloc.start()
+    start, cpu_start = time.perf_counter(), time.process_time()
+    value = func()
+    seconds, cpu_seconds = time.perf_counter() - start, time.process_time() - cpu_start
+    peak = 0
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    results[stage] = {
+        "seconds": round(seconds, 4),
+        "cpu_seconds": round(cpu_seconds, 4),
+        "peak_mb": round(peak / 1024 ** 2, 2),
+        "count_in": count_in,
+        "count_out": count_out(value),
+    }
+    print(f"  {stage:<28} {seconds:9.3f}s {peak / 1024 ** 2:10.1f} MB  {count_in} -> {results[stage]['count_out']}")
+    return value
+
+
+def run_size(count, seed=0, trace_memory=True):
+    """
+    Benchmarks every stage on a synthetic corpus of one size: each function of src/clean.py, the fused
+    normalize_entries, build_group_index, create_tree, find_overlaps, tree_to_string, the streaming tree
+    renderer and the overlap text and mapping CSV writer.
+
+    Returns:
+        dict: The measurements of each stage.
+    """
+    results = {}
+    entries = generate_entries(count, seed)
+    print(f"{count} entries")
+
+    # The original chain of clean steps, each over the whole list
+    stepped = [dict(entry) for entry in entries]
+    name_cache.clear()
+    for step in clean_steps:
+        stepped = measure(results, step, lambda: getattr(clean, step)(stepped), len(stepped), trace_memory)
+    del stepped
+
+    name_cache.clear()
+    cleaned = [dict(entry) for entry in entries]
+    cleaned = measure(results, 'normalize_entries', lambda: clean.normalize_entries(cleaned), count, trace_memory)
+
+    groups = measure(results, 'build_group_index', lambda: build_group_index(cleaned), count, trace_memory)
+    tree = measure(results, 'create_tree', lambda: create_tree(groups), len(groups), trace_memory,
+                   count_out=lambda root: sum(len(node.children) for node in root.children))
+    records = measure(results, 'find_overlaps', lambda: list(find_overlaps(groups)), len(groups), trace_memory)
+    measure(results, 'tree_to_string', lambda: tree_to_string(tree), len(groups), trace_memory,
+            count_out=lambda text: text.count('\n') + 1)
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        measure(results, 'render_tree', lambda: write_tree(tree, os.path.join(output_dir, 'bench.txt')),
+                len(groups), trace_memory, count_out=lambda lines: lines)
+        del tree
+        measure(results, 'write_overlap_records',
+                lambda: write_overlap_records(records, os.path.join(output_dir, 'bench_overlap.txt'),
+                                              os.path.join(output_dir, 'bench_mapping.csv')),
+                len(records), trace_memory, count_out=lambda written: written)
+    return results
+
+
+def compare(current, baseline, threshold=1.25, min_seconds=0.05, min_mb=1.0):
+    """
+    Compares benchmark results against a baseline and lists the stages that got slower or use more memory.
+    Small absolute differences are ignored, since they are mostly noise.
+
+    Args:
+        current (dict): The current results, as written by main.
+        baseline (dict): The baseline results.
+        threshold (float): The ratio to the baseline above which a stage counts as a regression.
+        min_seconds (float): The smallest time difference that counts.
+        min_mb (float): The smallest memory difference that counts.
+
+    Returns:
+        list: (size, stage, metric, baseline value, current value) for each regression.
+    """
+    regressions = []
+    for size, stages in current["results"].items():
+        for stage, result in stages.items():
+            previous = baseline.get("results", {}).get(size, {}).get(stage)
+            if not previous:
+                continue
+            for metric, minimum in (("seconds", min_seconds), ("peak_mb", min_mb)):
+                before, after = previous[metric], result[metric]
+                if after > before * threshold and after - before > minimum:
+                    regressions.append((size, stage, metric, before, after))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every pipeline stage on synthetic name corpora.")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma-separated corpus sizes.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the synthetic corpora.")
+    parser.add_argument("--output", default="bench_results.json", help="JSON file the results are written to.")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against.")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="Ratio to the baseline above which a stage counts as a regression.")
+    parser.add_argument("--no-memory", dest="trace_memory", action="store_false",
+                        help="Skip memory tracing, which slows every stage down, for more accurate times.")
+    args = parser.parse_args()
+
+    results = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "trace_memory": args.trace_memory,
+        },
+        "results": {},
+    }
+    for size in (int(size) for size in args.sizes.split(',')):
+        results["results"][str(size)] = run_size(size, args.seed, args.trace_memory)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Benchmark results saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("trace_memory") != args.trace_memory:
+            print("Warning: the baseline was run with different memory tracing, so times are not comparable.")
+        regressions = compare(results, baseline, args.threshold)
+        for size, stage, metric, before, after in regressions:
+            print(f"Regression at {size} entries: {stage} {metric} {before} -> {after}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
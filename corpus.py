@@ -0,0 +1,154 @@
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from src import download
+from src.clean import normalize_entries
+from src.visualize import build_group_index, build_fuzzy_index, find_overlaps
+from separate import write_overlap_records, output_names
+
+def init_worker(db_config):
+    """
+    Drops the connection pool inherited from the parent process so each worker opens its own, and
+    hands the worker the parent's database settings so it never loads the pipeline Config itself.
+    """
+    download._pool = None
+    download.set_db_config(db_config)
+
+def shard_rows(shard, shard_count, full_shard=False):
+    """
+    Yields the (name, source_cache, record_id, uri) rows of one shard. Unless full_shard is set, only
+    the rows whose name key collides with another row's are fetched, since a name with a unique key
+    cannot overlap with another under exact grouping.
+    """
+    if full_shard:
+        yield from download.fetch_shard(shard, shard_count)
+        return
+    for group in download.fetch_overlap_candidates(shard=shard, shard_count=shard_count):
+        yield from zip(group["names"], group["source_caches"], group["record_ids"], group["uris"])
+
+def dedupe_records(groups):
+    """
+    Keeps only the first entry of each record in every group. The view has one row per primary name,
+    so a record with several primary names would otherwise overlap with itself.
+
+    Args:
+        groups (dict): A group index of entries with 'source_cache' and 'record_id' fields.
+
+    Returns:
+        dict: The group index with at most one entry per record in each group.
+    """
+    deduped = {}
+    for key, group in groups.items():
+        records = {}
+        for entry in group:
+            records.setdefault((entry["source_cache"], entry["record_id"]), entry)
+        deduped[key] = list(records.values()) if len(records) < len(group) else group
+    return deduped
+
+def process_shard(shard, shard_count, fuzzy=False, min_confidence=None, consider_dates=True, full_shard=False):
+    """
+    Runs one shard of the corpus through clean, group and overlap detection. With exact grouping only
+    the candidate groups sharing a name key in the database are fetched, and they are re-grouped with
+    the Python cleaning rules, which the SQL key only approximates. Fuzzy grouping links names with
+    different keys, so it always reads the whole shard.
+
+    Args:
+        shard (int): The shard to process.
+        shard_count (int): The total number of shards.
+        fuzzy (bool): Whether to group near-duplicate names together.
+        min_confidence (float): Optional match confidence below which overlap groups are left out.
+        consider_dates (bool): Whether to split groups whose life dates cannot belong to one person.
+        full_shard (bool): Whether to read every row of the shard with exact grouping too.
+
+    Returns:
+        tuple: (list of overlap records, number of entries)
+    """
+    entries = normalize_entries(
+        {"name": name, "type": "person", "uri": uri, "equivalent": uri, "source_cache": source_cache,
+         "record_id": record_id}
+        for name, source_cache, record_id, uri in shard_rows(shard, shard_count, full_shard or fuzzy)
+    )
+    groups = dedupe_records(build_fuzzy_index(entries) if fuzzy else build_group_index(entries))
+
+    records = list(find_overlaps(groups, min_confidence=min_confidence, consider_dates=consider_dates))
+
+    download.close_pool()
+    return records, len(entries)
+
+def process_corpus(output='corpus.txt', shards=None, workers=None, fuzzy=False, min_confidence=None, refresh=False,
+                   jsonl=False, compress=False, progress=False, consider_dates=True, full_shards=False):
+    """
+    Finds overlapping person records across every cache in the combined materialized view. The view
+    is partitioned by a hash of the normalized surname, each shard is processed in its own worker
+    process, and the shard outputs are merged into one overlap file and one mapping CSV. The URIs of
+    all shards are clustered together, so a URI found in several groups maps to a single primary.
+
+    Args:
+        output (str): The output file name.
+        shards (int): The number of shards. Defaults to four per worker.
+        workers (int): The number of worker processes. Defaults to the number of CPUs.
+        fuzzy (bool): Whether to group near-duplicate names together.
+        min_confidence (float): Optional match confidence below which overlap groups are left out.
+        refresh (bool): Whether to refresh the combined materialized view first.
+        jsonl (bool): Whether to also write the overlap records to a JSONL file.
+        compress (bool): Whether to gzip the overlap text and JSONL files, adding ".gz" to their names.
+        progress (bool): Whether to show a progress bar while writing.
+        consider_dates (bool): Whether to split groups whose life dates cannot belong to one person.
+        full_shards (bool): Whether to read every row of each shard instead of only the rows whose name
+            key collides in the database, which also finds the exact overlaps the SQL key misses.
+
+    Returns:
+        None
+    """
+    workers = workers or os.cpu_count() or 1
+    shards = shards or 4 * workers
+
+    print("Checking on combined materialized view...")
+    download.create_combined_materialized_view(download.all_caches, refresh=refresh)
+    # Workers must not share the parent's connections
+    download.close_pool()
+
+    overlap_output, csv_output, jsonl_output = output_names(output, jsonl, compress)
+    start_time = time.time()
+    entry_total = 0
+
+    def shard_records(results):
+        nonlocal entry_total
+        for shard, (records, entry_count) in enumerate(results):
+            entry_total += entry_count
+            print(f"Shard {shard + 1}/{shards}: {entry_count} entries, {len(records)} overlap groups")
+            yield from records
+
+    with ProcessPoolExecutor(workers, initializer=init_worker,
+                             initargs=(download.get_db_config(),)) as executor:
+        results = executor.map(process_shard, range(shards), [shards] * shards, [fuzzy] * shards,
+                               [min_confidence] * shards, [consider_dates] * shards, [full_shards] * shards)
+        write_overlap_records(shard_records(results), overlap_output, csv_output, jsonl_output, progress=progress)
+
+    print(f"Processed {entry_total} entries in {time.time() - start_time:.2f} seconds with {workers} workers.")
+    print(f"Simplified overlap structure saved to {overlap_output}")
+    print(f"URI mappings saved to {csv_output}")
+    if jsonl_output:
+        print(f"Overlap records saved to {jsonl_output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Identify potentially overlapping person records across all caches.")
+    parser.add_argument("output", nargs="?", default="corpus.txt", help="The output file name.")
+    parser.add_argument("--workers", type=int, help="Number of worker processes. Defaults to the number of CPUs.")
+    parser.add_argument("--shards", type=int, help="Number of surname shards. Defaults to four per worker.")
+    parser.add_argument("--fuzzy", action="store_true", help="Group near-duplicate names, not only exact matches.")
+    parser.add_argument("--ignore-dates", dest="consider_dates", action="store_false", help="Keep name groups together even when their life dates cannot belong to one person.")
+    parser.add_argument("--min-confidence", type=float, help="Leave out overlap groups scoring below this match confidence (0-1).")
+    parser.add_argument("--refresh", action="store_true", help="Refresh the combined materialized view first.")
+    parser.add_argument("--jsonl", action="store_true", help="Also write the overlap groups as JSON records, one per line.")
+    parser.add_argument("--gzip", dest="compress", action="store_true", help="Gzip the overlap text and JSONL outputs, adding .gz to their names.")
+    parser.add_argument("--progress", action="store_true", help="Show a progress bar while writing the outputs.")
+    parser.add_argument("--full-shards", action="store_true", help="Read every row of each shard, not only the rows whose name key collides in the database.")
+    args = parser.parse_args()
+
+    process_corpus(args.output, shards=args.shards, workers=args.workers, fuzzy=args.fuzzy,
+                   min_confidence=args.min_confidence, refresh=args.refresh, jsonl=args.jsonl,
+                   compress=args.compress, progress=args.progress, consider_dates=args.consider_dates,
+                   full_shards=args.full_shards)
@@ -0,0 +1,173 @@
+import json
+import time
+import random
+import argparse
+import threading
+import urllib.parse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from src.synthetic import generate_entries
+from src.download import primary_name_id
+
+page_size = 20
+
+# The parts of the LuxY advanced search config that PeopleGroups().filter() validates against
+search_config = {
+    "terms": {
+        "agent": {
+            "name": {"label": "Name", "helpText": "Search for people by name.", "relation": "text"},
+            "recordType": {"label": "Category", "helpText": "People or groups.", "relation": "text",
+                           "values": ["person", "group"]},
+        }
+    }
+}
+
+
+def query_name(query):
+    """
+    Returns the lowercased name filter of an encoded LuxY search query, or '' when it has none.
+    """
+    try:
+        terms = json.loads(query).get("AND", [])
+    except (ValueError, AttributeError):
+        return ''
+    for term in terms:
+        if isinstance(term, dict) and isinstance(term.get("name"), str):
+            return term["name"].lower()
+    return ''
+
+
+class StubLux:
+    """
+    A local stand-in for the LuxY API serving synthetic person records. A search matches the records
+    whose name contains the name filter, case-insensitively. Latency and failures can be injected
+    into the record responses to exercise the download retries.
+
+    Args:
+        count (int): The number of synthetic records.
+        seed (int): The random seed of the synthetic names.
+        delay (float): Seconds each response is delayed, to mimic network latency.
+        jitter (float): Up to this many extra seconds each record response is delayed at random, so
+            concurrent requests complete out of order.
+        failures (int): The number of times each record answers 503 before it is served.
+        stall (float): Seconds the first attempt after the failures of each record is held, so that
+            clients with a shorter timeout give up and retry.
+    """
+
+    def __init__(self, count=10000, seed=0, delay=0.0, jitter=0.0, failures=0, stall=0.0):
+        self.records = generate_entries(count, seed)
+        self.delay = delay
+        self.jitter = jitter
+        self.failures = failures
+        self.stall = stall
+        self.requests = 0
+        # Record number -> requests received for it
+        self.attempts = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def search(self, base_url, path, query, page):
+        name = query_name(query)
+        matches = [i for i, entry in enumerate(self.records) if name in entry["name"].lower()]
+        start = (page - 1) * page_size
+        return {
+            "id": f"{base_url}{path}?q={urllib.parse.quote(query)}&page={page}",
+            "partOf": [{"totalItems": len(matches)}],
+            "orderedItems": [{"id": f"{base_url}/data/person/{i:08x}", "type": "Person"}
+                             for i in matches[start:start + page_size]],
+        }
+
+    def record(self, base_url, i):
+        entry = self.records[i]
+        return {
+            "id": f"{base_url}/data/person/{i:08x}",
+            "type": "Person",
+            "_label": entry["name"],
+            "identified_by": [{"type": "Name", "content": entry["name"], "classified_as": [{"id": primary_name_id}]}],
+            "equivalent": [{"id": entry["equivalent"]}] if entry.get("equivalent") else [],
+        }
+
+    def respond_record(self, base_url, i):
+        with self._lock:
+            attempt = self.attempts[i] = self.attempts.get(i, 0) + 1
+            jitter = self._random.uniform(0, self.jitter)
+        if attempt <= self.failures:
+            return 503, {"error": "Service unavailable"}
+        time.sleep(jitter + (self.stall if attempt == self.failures + 1 else 0))
+        return 200, self.record(base_url, i)
+
+    def respond(self, base_url, url):
+        """
+        Returns the status and JSON body of a GET request.
+        """
+        with self._lock:
+            self.requests += 1
+        if self.delay:
+            time.sleep(self.delay)
+        parsed = urllib.parse.urlsplit(url)
+        params = urllib.parse.parse_qs(parsed.query)
+        if parsed.path == "/api/advanced-search-config":
+            return 200, search_config
+        if parsed.path.startswith("/api/search/"):
+            return 200, self.search(base_url, parsed.path, params.get("q", ["{}"])[0], int(params.get("page", ["1"])[0]))
+        if parsed.path.startswith("/data/person/"):
+            try:
+                i = int(parsed.path.rsplit("/", 1)[1], 16)
+            except ValueError:
+                i = -1
+            if 0 <= i < len(self.records):
+                return self.respond_record(base_url, i)
+        return 404, {"error": "Not found"}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        host, port = self.server.server_address[:2]
+        status, body = self.server.lux.respond(f"http://{host}:{port}", self.path)
+        data = json.dumps(body).encode('utf-8')
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        except ConnectionError:
+            # The client gave up waiting, e.g. on a stalled response
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_stub_server(host='127.0.0.1', port=0, count=10000, seed=0, delay=0.0, jitter=0.0, failures=0, stall=0.0):
+    """
+    Returns a stub LuxY server, not yet serving. Port 0 picks a free port, found in server_address.
+    The remaining arguments are the same as for StubLux.
+    """
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.lux = StubLux(count, seed, delay, jitter, failures, stall)
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve synthetic person records through a local stand-in for the LuxY API.")
+    parser.add_argument("--host", default="127.0.0.1", help="The address to listen on.")
+    parser.add_argument("--port", type=int, default=8001, help="The port to listen on.")
+    parser.add_argument("--count", type=int, default=10000, help="The number of synthetic person records.")
+    parser.add_argument("--seed", type=int, default=0, help="The random seed of the synthetic names.")
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds each response is delayed, to mimic network latency.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Up to this many extra seconds each record response is delayed at random.")
+    parser.add_argument("--failures", type=int, default=0, help="Number of times each record answers 503 before it is served.")
+    parser.add_argument("--stall", type=float, default=0.0, help="Seconds the first served response of each record is held, to trigger client timeouts.")
+    args = parser.parse_args()
+
+    server = make_stub_server(args.host, args.port, args.count, args.seed, args.delay, args.jitter, args.failures,
+                              args.stall)
+    print(f"Stub LuxY API with {args.count} records at http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -1,17 +1,22 @@
 import os
-import sys
-from src.download import extract_luxy_entries
-from src.visualize import create_tree, find_overlaps, write_tree, tree_to_string
-from src.clean import check_parentheses, extract_parentheticals, remove_parentheticals, move_lastname, extract_name_parts, standardize_abbreviations, remove_dates
-from luxy import PeopleGroups
-import pandas as pd
-from itertools import combinations
-from tqdm import tqdm
+import argparse
+import re
+import json
+import threading
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from src.visualize import (build_group_index, build_fuzzy_index, create_tree, find_overlaps, write_tree,
+                           iter_streamed_overlaps, iter_overlap_records, iter_overlap_groups, render_overlaps,
+                           overlap_record, entry_group_key, open_output, split_life_spans)
+from src.clean import normalize_entry, normalize_entries, iter_normalized, name_cache
+from src.cache import ResponseCache, default_cache_dir, normalize_query
+from src.instrument import Profiler, null_profiler, count_items
+from src.state import RunState, entry_hash, encode_key, decode_key
 import csv
 
 uri_priority = [
         "https://linked-art.library.yale.edu/",
-        "https://images.peabody.yale.edu/"
+        "https://images.peabody.yale.edu/",
         "https://media.art.yale.edu/",
         "https://ycba-lux.s3.amazonaws.com/",
         "https://data.paul-mellon-center.ac.uk/",
@@ -25,10 +30,34 @@ uri_priority = [
         "https://ror.org/"
     ]
 
+# The filters every query is searched with
+query_filters = {"recordType": "person"}
+
+def uri_host(uri):
+    """
+    Returns the scheme and host part of a URI, e.g. "http://viaf.org/viaf/1" -> "http://viaf.org".
+    """
+    start = uri.find('://')
+    end = uri.find('/', start + 3 if start != -1 else 0)
+    return uri if end == -1 else uri[:end]
+
+def build_prefix_index(prefixes):
+    """
+    Precompiles a list of URI prefixes into a dictionary keyed by scheme and host, holding the
+    (priority, prefix) pairs that share that host in priority order.
+    """
+    index = {}
+    for i, prefix in enumerate(prefixes):
+        index.setdefault(uri_host(prefix), []).append((i, prefix))
+    return index
+
+priority_index = build_prefix_index(uri_priority)
+
 def get_priority_index(uri):
     """
     Returns the priority index of a URI based on the uri_priority list.
-    Lower index = higher priority.
+    Lower index = higher priority. The lookup goes through priority_index, so only the
+    prefixes sharing the URI's host are compared.
     
     Args:
         uri (str): The URI to check
@@ -36,132 +65,673 @@ def get_priority_index(uri):
     Returns:
         int: The priority index (position in uri_priority list), or len(uri_priority) if not found
     """
-    for i, prefix in enumerate(uri_priority):
+    for i, prefix in priority_index.get(uri_host(uri), ()):
         if uri.startswith(prefix):
             return i
     return len(uri_priority)  # Return lowest priority if URI doesn't match any prefix
 
-def extract_uri_from_line(line):
+class UriClusters:
     """
-    Extracts URI from a line containing 'equivalent:' text.
-    
+    Union-find over the URIs of overlap groups. Groups that share any URI are merged into one
+    connected component, and each component is mapped to a single primary URI chosen by uri_priority.
+    Union by size with path halving keeps this near-linear in the number of URIs.
+    """
+
+    def __init__(self):
+        self.parent = {}
+        self.size = {}
+        # The group name and confidence each URI was first seen with, in first-seen order
+        self.origin = {}
+
+    def find(self, uri):
+        parent = self.parent
+        while parent[uri] != uri:
+            parent[uri] = parent[parent[uri]]
+            uri = parent[uri]
+        return uri
+
+    def union(self, first, second):
+        first, second = self.find(first), self.find(second)
+        if first == second:
+            return
+        if self.size[first] < self.size[second]:
+            first, second = second, first
+        self.parent[second] = first
+        self.size[first] += self.size[second]
+
+    def add_group(self, group, uris, confidence=None):
+        """
+        Adds the URIs of one overlap group and links them to each other.
+
+        Args:
+            group (str): Group name
+            uris (list): The URIs in the group
+            confidence (float): Optional match confidence of the group
+        """
+        previous = None
+        for uri in uris:
+            if uri not in self.parent:
+                self.parent[uri] = uri
+                self.size[uri] = 1
+                self.origin[uri] = (group, confidence)
+            if previous is not None:
+                self.union(previous, uri)
+            previous = uri
+
+    def components(self):
+        """
+        Returns the connected components as lists of URIs, in the order their first URI was seen.
+        """
+        components = {}
+        for uri in self.origin:
+            components.setdefault(self.find(uri), []).append(uri)
+        return list(components.values())
+
+    def rows(self):
+        """
+        Yields one [primary URI, related URI, group, confidence] row per related URI, mapping it to the
+        highest priority URI of its component.
+        """
+        for uris in self.components():
+            # sorted() is stable, so ties keep the order the URIs were first seen in
+            sorted_uris = sorted(uris, key=get_priority_index)
+            primary_uri = sorted_uris[0]
+            for related_uri in sorted_uris[1:]:
+                group, confidence = self.origin[related_uri]
+                yield [primary_uri, related_uri, group, confidence]
+
+    def write(self, writer):
+        """
+        Writes the mapping rows to a CSV writer.
+
+        Args:
+            writer (csv.writer): The CSV writer
+
+        Returns:
+            int: The number of rows written
+        """
+        rows = 0
+        for row in self.rows():
+            writer.writerow(row)
+            rows += 1
+        return rows
+
+csv_header = ['Primary URI', 'Related URI', 'Group', 'Confidence']
+
+def record_uris(record):
+    """
+    Returns the URIs of an overlap record: the group's own equivalent, if any, followed by the
+    equivalent of each entry. Candidate entries may belong to several groups, so they are left out.
+
     Args:
-        line (str): Line containing URI
-        
+        record (dict): An overlap record from find_overlaps
+
     Returns:
-        str: Extracted URI or None if not found
+        list: The URIs in the group
     """
-    if 'equivalent:' in line:
-        return line.split('equivalent:')[1].strip().strip('()')
-    return None
+    uris = [record['equivalent']] if record.get('equivalent') else []
+    uris.extend(entry['equivalent'] for entry in record['entries']
+                if entry.get('equivalent') and not entry.get('candidate'))
+    return uris
 
-def clean_group_name(name):
+def write_mapping_csv(clusters, csv_output):
     """
-    Removes URI from group name if present.
-    
+    Writes the URI mappings of clustered overlap groups to a CSV file.
+
     Args:
-        name (str): Group name potentially containing URI
-        
+        clusters (UriClusters): The clustered URIs
+        csv_output (str): Output CSV file path
+    """
+    with open(csv_output, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(csv_header)
+        clusters.write(writer)
+
+def output_names(output, jsonl=False, compress=False):
+    """
+    Returns the overlap text, mapping CSV and JSONL file names of an output, e.g. "fred.txt" ->
+    ("fred_overlap.txt", "fred_mapping.csv", "fred_overlap.jsonl"). The JSONL name is None unless jsonl
+    is set, and the text and JSONL names end in ".gz" when compress is set.
+    """
+    base = output.replace(".txt", "")
+    suffix = ".gz" if compress else ""
+    jsonl_output = f'{base}_overlap.jsonl{suffix}' if jsonl else None
+    return f'{base}_overlap.txt{suffix}', f'{base}_mapping.csv', jsonl_output
+
+def write_overlap_records(records, overlap_output, csv_output, jsonl_output=None, progress=False):
+    """
+    Writes overlap records to the overlap text file, and optionally to a JSONL file with one record
+    per line, as each record arrives. Only the URIs are kept, for clustering, and the mapping CSV is
+    written at the end. Text and JSONL files whose names end in ".gz" are gzip-compressed.
+
+    Args:
+        records (iterable): Overlap records, e.g. from find_overlaps
+        overlap_output (str): Output overlap text file path
+        csv_output (str): Output CSV file path
+        jsonl_output (str): Optional output JSONL file path
+        progress (bool): Whether to show a progress bar of the groups written
+
     Returns:
-        str: Cleaned group name
+        int: The number of records written
     """
-    if '(equivalent:' in name:
-        return name.split('(equivalent:')[0].strip()
-    return name
+    clusters = UriClusters()
+    with open_output(overlap_output) as overlap_file, \
+            (open_output(jsonl_output, encoding='utf-8') if jsonl_output else nullcontext()) as jsonl_file:
+
+        def collected(records):
+            for record in records:
+                if jsonl_file:
+                    jsonl_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                clusters.add_group(record['name'], record_uris(record), record['confidence'])
+                yield record
+
+        written = render_overlaps(collected(records), overlap_file, progress=progress)
 
-def tree_to_csv(tree_str, output_file):
+    write_mapping_csv(clusters, csv_output)
+    return written
+
+def print_name_cache_stats():
     """
-    Converts tree structure to CSV mapping highest priority URIs to related URIs.
-    
+    Prints the name cache statistics and saves the cache if it has an on-disk store.
+    """
+    stats = name_cache.stats()
+    print(f"Name cache: {stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions")
+    name_cache.save()
+
+def load_entries(query, workers=8, refresh=False, offline=False, cache_dir=default_cache_dir, cache_ttl=None,
+                 known=None):
+    """
+    Returns the entries of a query from the local results cache, downloading and caching them when no
+    fresh copy is cached.
+
     Args:
-        tree_str (str): String containing the tree structure
-        output_file (str): Output CSV file path
+        query (str): The query to search for.
+        workers (int): The maximum number of concurrent requests used to download records.
+        refresh (bool): Whether to download the results again even if a fresh copy is cached.
+        offline (bool): Whether to use only cached results, even expired ones, without any download.
+        cache_dir (str): The directory of the results cache, or None to disable it.
+        cache_ttl (float): Optional number of hours a cached result stays fresh.
+        known (dict): Optional entries already downloaded, keyed by record URI, that are not fetched again.
+
+    Returns:
+        iterable: The entries, as a list when cached and as a generator while downloading.
+
+    Raises:
+        LookupError: If offline is set and the query is not cached.
     """
-    current_group = None
-    group_uris = {}
-    
-    # Parse the tree structure
-    for line in tree_str.split('\n'):
-        line = line.strip()
-        if not line:
+    filters = query_filters
+    cache = ResponseCache(cache_dir) if cache_dir else None
+    if cache and cache_ttl is not None:
+        cache.ttl = cache_ttl * 3600
+
+    if cache and not refresh:
+        entries = cache.get(query, filters, allow_stale=offline)
+        if entries is not None:
+            print(f"Using {len(entries)} cached entries for '{query}' ({cache.age(query, filters) / 3600:.1f} hours old)")
+            return entries
+    if offline:
+        raise LookupError(f"No cached results for '{query}' and --offline was given.")
+
+    # Only needed to download, so cached and offline runs never load them
+    from luxy import PeopleGroups
+    from src.download import extract_luxy_entries
+
+    pg = PeopleGroups().filter(name=query, **filters).get()
+    print(f"Examining the following data: {pg.view_url}")
+
+    # Download entries from the given URL
+    entries = extract_luxy_entries(pg, max_workers=workers, known=known)
+    return cache.record(query, filters, entries) if cache else entries
+
+def configure_name_cache(name_cache_path=None, name_cache_size=None):
+    """
+    Applies the size limit and on-disk store options to the shared name cache.
+    """
+    if name_cache_size:
+        name_cache.maxsize = name_cache_size
+    if name_cache_path:
+        name_cache.path = name_cache_path
+        if os.path.exists(name_cache_path):
+            name_cache.load(name_cache_path)
+
+def write_outputs(entries, output, full_tree=False, fuzzy=False, min_confidence=None, stream=False, jsonl=False,
+                  compress=False, progress=False, consider_dates=True, profiler=null_profiler):
+    """
+    Groups cleaned entries and writes the overlap text and mapping CSV, and optionally the full tree
+    and the overlap records as JSONL.
+
+    Args:
+        entries (iterable): Cleaned entries.
+        output (str): The output file name. The overlap and mapping files are named after it.
+        full_tree (bool): Whether to also render the full name tree to the output file.
+        fuzzy (bool): Whether to group near-duplicate names together.
+        min_confidence (float): Optional match confidence below which overlap groups are left out.
+        stream (bool): Whether to group with bounded memory, spilling entries to disk by surname bucket.
+        jsonl (bool): Whether to also write the overlap records to a JSONL file.
+        compress (bool): Whether to gzip the full tree, overlap text and JSONL files, adding ".gz" to their names.
+        progress (bool): Whether to show progress bars while writing.
+        consider_dates (bool): Whether to split groups whose life dates cannot belong to one person.
+        profiler (Profiler): Optional profiler measuring the group, tree, overlap and write stages.
+
+    Returns:
+        None
+    """
+    overlap_output, csv_output, jsonl_output = output_names(output, jsonl, compress)
+
+    if stream:
+        # Every stage runs interleaved while streaming, so they are measured as one
+        with profiler.stage('stream', count_in=count_items(entries)) as stage:
+            overlaps = iter_streamed_overlaps(entries, fuzzy=fuzzy, consider_dates=consider_dates)
+            records = iter_overlap_records(overlaps, min_confidence=min_confidence)
+            count = write_overlap_records(records, overlap_output, csv_output, jsonl_output, progress=progress)
+            stage['count_out'] = count
+        print(f"Streamed {count} overlap groups to {overlap_output}")
+    else:
+        # Group entries and find overlaps
+        with profiler.stage('group', count_in=count_items(entries)) as stage:
+            groups = build_fuzzy_index(entries) if fuzzy else build_group_index(entries)
+            stage['count_out'] = len(groups)
+
+        if full_tree:
+            with profiler.stage('create_tree', count_in=len(groups)) as stage:
+                tree = create_tree(groups, consider_dates=consider_dates)
+                stage['count_out'] = len(groups)
+            tree_output = f"{output}.gz" if compress else output
+            with profiler.stage('render_tree', count_in=len(groups)):
+                write_tree(tree, tree_output, compress=compress, progress=progress)
+            print(f"Full tree structure saved to {tree_output}")
+
+        records = find_overlaps(groups, min_confidence=min_confidence, consider_dates=consider_dates)
+        if profiler.enabled:
+            # Score before writing so the two are measured apart
+            with profiler.stage('find_overlaps', count_in=len(groups)) as stage:
+                records = list(records)
+                stage['count_out'] = len(records)
+
+        # Write overlap data
+        with profiler.stage('write_overlaps', count_in=count_items(records)) as stage:
+            stage['count_out'] = write_overlap_records(records, overlap_output, csv_output, jsonl_output,
+                                                       progress=progress)
+        print(f"Simplified overlap structure saved to {overlap_output}")
+    print(f"URI mappings saved to {csv_output}")
+    if jsonl_output:
+        print(f"Overlap records saved to {jsonl_output}")
+
+def update_outputs(entries, output, min_confidence=None, jsonl=False, compress=False, progress=False):
+    """
+    Updates the overlap and mapping files of a previous run with exact grouping, cleaning and
+    regrouping only the records that are new or changed since then. The previous run is read from
+    "<output>_state.json", which holds the content hash and group key of every record and the
+    overlap record of every group. Only the groups touched by a new, changed or removed record are
+    rebuilt, split by life dates and rescored; the other groups are taken from the state as they are. Without a state,
+    every record is processed, so the first run produces the same output as write_outputs.
+
+    Args:
+        entries (iterable): Downloaded entries, not yet cleaned.
+        output (str): The output file name. The overlap, mapping and state files are named after it.
+        min_confidence (float): Optional match confidence below which overlap groups are left out.
+        jsonl (bool): Whether to also write the overlap records to a JSONL file.
+        compress (bool): Whether to gzip the overlap text and JSONL files, adding ".gz" to their names.
+        progress (bool): Whether to show a progress bar while writing.
+
+    Returns:
+        dict: The names of the overlap groups that were added, removed and changed.
+    """
+    from src.score import group_confidence
+
+    base = output.replace(".txt", "")
+    state = RunState(f'{base}_state.json')
+    resumed = state.load()
+
+    records = {}
+    # (record id, entry, cleaned entry or None when unchanged) in input order
+    order = []
+    occurrences = {}
+    affected = set()
+    changed = 0
+    for entry in entries:
+        digest = entry_hash(entry)
+        # Records are identified by URI, or by content when they have none, numbering repeats
+        record_id = entry.get('uri') or digest
+        occurrence = occurrences[record_id] = occurrences.get(record_id, -1) + 1
+        if occurrence:
+            record_id = f"{record_id}#{occurrence}"
+
+        previous = state.records.get(record_id)
+        if previous is not None and previous[0] == digest:
+            records[record_id] = previous
+            order.append((record_id, entry, None))
             continue
-            
-        if line.startswith('──'):
-            # New main group - clean the name first
-            current_group = line.replace('──', '').strip()
-            current_group = clean_group_name(current_group)
-            group_uris[current_group] = []
-            # If the group name had a URI, add it to the URIs list
-            uri = extract_uri_from_line(line)
-            if uri:
-                group_uris[current_group].append(uri)
-        elif line.startswith('└──'):
-            # URI entry
-            uri = extract_uri_from_line(line)
-            if uri and current_group:
-                group_uris[current_group].append(uri)
-    
-    # Write CSV file
-    with open(output_file, 'w', newline='') as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(['Primary URI', 'Related URI', 'Group'])
-        
-        for group, uris in group_uris.items():
-            if not uris:
-                continue
-                
-            # Sort URIs by priority
-            sorted_uris = sorted(uris, key=get_priority_index)
-            primary_uri = sorted_uris[0]
-            
-            # Write a row for each related URI
-            for related_uri in sorted_uris[1:]:
-                writer.writerow([primary_uri, related_uri, group])
 
-def process_query(query, output='output.txt'):
+        cleaned = normalize_entry(dict(entry))
+        key = entry_group_key(cleaned)
+        key = encode_key(key) if key is not None else None
+        records[record_id] = [digest, key]
+        order.append((record_id, entry, cleaned))
+        affected.update((key, previous[1] if previous else None))
+        changed += 1
+
+    removed_records = [record_id for record_id in state.records if record_id not in records]
+    affected.update(state.records[record_id][1] for record_id in removed_records)
+    affected.discard(None)
+
+    # Rebuild the affected groups from all their members, cleaning the unchanged ones as needed
+    members = [cleaned if cleaned is not None else normalize_entry(dict(entry))
+               for record_id, entry, cleaned in order if records[record_id][1] in affected]
+    rebuilt = {encode_key(key): overlap_record(key, group, group_confidence(group))
+               for key, group in iter_overlap_groups(split_life_spans(build_group_index(members)))}
+
+    # A group split by life dates is stored under its group key plus each life span
+    previous_keys = [key for key in state.groups if encode_key(decode_key(key)[:4]) in affected]
+
+    diff = {'added': [], 'removed': [], 'changed': []}
+    for key in sorted(set(previous_keys) | set(rebuilt), key=decode_key):
+        old, new = state.groups.pop(key, None), rebuilt.get(key)
+        if new is not None:
+            state.groups[key] = new
+        if old is None and new is not None:
+            diff['added'].append(new['name'])
+        elif old is not None and new is None:
+            diff['removed'].append(old['name'])
+        elif old != new:
+            diff['changed'].append(new['name'])
+
+    state.records = records
+    state.save()
+
+    overlap_output, csv_output, jsonl_output = output_names(output, jsonl, compress)
+    overlaps = (record for record in state.iter_records()
+                if min_confidence is None or record['confidence'] >= min_confidence)
+    write_overlap_records(overlaps, overlap_output, csv_output, jsonl_output, progress=progress)
+
+    print(f"{changed} new or changed and {len(removed_records)} removed records out of {len(records)}; "
+          f"{len(members)} records regrouped.")
+    print(f"Overlap groups: {len(diff['added'])} added, {len(diff['removed'])} removed, {len(diff['changed'])} changed")
+    # Every group is new on a first run, so only list them when updating a previous run
+    if resumed:
+        for sign, change in (('+', 'added'), ('-', 'removed'), ('~', 'changed')):
+            for name in diff[change]:
+                print(f"  {sign} {name}")
+    print(f"Simplified overlap structure saved to {overlap_output}")
+    print(f"URI mappings saved to {csv_output}")
+    if jsonl_output:
+        print(f"Overlap records saved to {jsonl_output}")
+    return diff
+
+def process_query(query, output='output.txt', name_cache_path=None, name_cache_size=None, full_tree=False, fuzzy=False,
+                  min_confidence=None, stream=False, jsonl=False, incremental=False, entry_store=None,
+                  compress=False, progress=False, consider_dates=True, workers=8, refresh=False, offline=False,
+                  cache_dir=default_cache_dir, cache_ttl=None, profiler=null_profiler):
     """
     Processes a query and creates tree and CSV output from the results.
 
     Args:
         query (str): The query to search for.
         output (str): The output file name.
+        name_cache_path (str): Optional JSON file used to persist parsed names across runs.
+        name_cache_size (int): Optional limit on the number of parsed names kept in the cache.
+        full_tree (bool): Whether to also render the full name tree to the output file.
+        fuzzy (bool): Whether to group near-duplicate names (e.g. "F. L. Adair" and "Fred Lyman Adair") together.
+        min_confidence (float): Optional match confidence below which overlap groups are left out.
+        stream (bool): Whether to stream entries through cleaning and grouping with bounded memory, spilling
+            them to disk by surname bucket instead of holding the whole result set in memory.
+        jsonl (bool): Whether to also write the overlap records to a JSONL file, one record per line.
+        incremental (bool): Whether to update the outputs of the previous run, reprocessing only the records
+            that changed since then. Not supported with full_tree, fuzzy or stream.
+        entry_store (str): Optional directory of a memory-mapped store of the cleaned entries. An existing
+            store built from the same query is loaded instead of downloading and cleaning the results,
+            unless refresh is set; otherwise the cleaned entries are saved there, replacing any store
+            of another query. Not supported with stream or incremental.
+        compress (bool): Whether to gzip the full tree, overlap text and JSONL files, adding ".gz" to their names.
+        progress (bool): Whether to show progress bars while writing.
+        consider_dates (bool): Whether to split name groups whose life dates cannot belong to one person, e.g.
+            "Adams, Fred, 1921-" and "Adams, Fred, 1961-". Incremental runs always split them.
+        workers (int): The maximum number of concurrent requests used to download records.
+        refresh (bool): Whether to download the results again even if a fresh copy is cached.
+        offline (bool): Whether to use only cached results, even expired ones, without any download.
+        cache_dir (str): The directory of the downloaded results cache, or None to disable it.
+        cache_ttl (float): Optional number of hours a cached result stays fresh.
+        profiler (Profiler): Optional profiler measuring each stage. While profiling, the download is
+            completed before cleaning starts so the two are measured apart, except when streaming.
 
     Returns:
         None
     """
-    pg = PeopleGroups().filter(name=query, recordType="person").get()
-    print(f"Examining the following data: {pg.view_url}")
+    from src.store import EntryStore
 
-    # Download entries from the given URL
-    entries = extract_luxy_entries(pg)
-
-    # Process entries
-    entries = standardize_abbreviations(entries)
-    entries = remove_dates(entries)
-    entries = check_parentheses(entries)
-    entries = extract_parentheticals(entries)
-    entries = remove_parentheticals(entries)
-    entries = move_lastname(entries)
-    entries = extract_name_parts(entries)
-
-    # Create tree and find overlaps
-    tree = create_tree(entries)
-    overlap_str = find_overlaps(tree)
-    
-    # Write overlap data
-    overlap_output = f'{output.replace(".txt", "")}_overlap.txt'
-    csv_output = f'{output.replace(".txt", "")}_mapping.csv'
-    write_tree(overlap_str, overlap_output)
-    tree_to_csv(overlap_str, csv_output)
-    print(f"Simplified overlap structure saved to {overlap_output}")
-    print(f"URI mappings saved to {csv_output}")
+    configure_name_cache(name_cache_path, name_cache_size)
+
+    # A store only stands in for the results of the query it was built from
+    source = {'query': normalize_query(query), 'filters': query_filters}
+    if entry_store and not refresh and EntryStore.exists(entry_store):
+        if EntryStore.matches(entry_store, source):
+            with profiler.stage('load_store') as stage:
+                entries = EntryStore.load(entry_store)
+                stage['count_out'] = len(entries)
+            print(f"Using {len(entries)} cleaned entries from {entry_store}")
+            write_outputs(entries, output, full_tree=full_tree, fuzzy=fuzzy, min_confidence=min_confidence,
+                          jsonl=jsonl, compress=compress, progress=progress, consider_dates=consider_dates,
+                          profiler=profiler)
+            return
+        print(f"Entry store {entry_store} was built from another query or version, so it is rebuilt.")
+
+    with profiler.stage('download') as stage:
+        entries = load_entries(query, workers=workers, refresh=refresh, offline=offline, cache_dir=cache_dir,
+                               cache_ttl=cache_ttl)
+        if profiler.enabled and not stream:
+            entries = list(entries)
+        stage['count_out'] = count_items(entries)
+
+    if incremental:
+        with profiler.stage('incremental_update', count_in=count_items(entries)):
+            update_outputs(entries, output, min_confidence=min_confidence, jsonl=jsonl, compress=compress,
+                           progress=progress)
+        print_name_cache_stats()
+        return
+
+    # Process entries in a single pass, lazily when streaming, where cleaning is part of the stream stage
+    if stream:
+        entries = iter_normalized(entries)
+    else:
+        misses, parse_seconds = name_cache.misses, name_cache.parse_seconds
+        with profiler.stage('clean', count_in=count_items(entries)) as stage:
+            entries = normalize_entries(entries)
+            stage['count_out'] = len(entries)
+            stage['name_parses'] = name_cache.misses - misses
+            stage['name_parse_seconds'] = round(name_cache.parse_seconds - parse_seconds, 3)
+    if entry_store:
+        with profiler.stage('save_store', count_in=len(entries)):
+            EntryStore.from_entries(entries).save(entry_store, source)
+            # Group from the memory-mapped store so the entry dictionaries can be freed
+            entries = EntryStore.load(entry_store)
+        print(f"Cleaned entries saved to {entry_store}")
+    write_outputs(entries, output, full_tree=full_tree, fuzzy=fuzzy, min_confidence=min_confidence, stream=stream,
+                  jsonl=jsonl, compress=compress, progress=progress, consider_dates=consider_dates, profiler=profiler)
+    print_name_cache_stats()
+
+def query_output_name(query, output_dir='.'):
+    """
+    Returns the output file name of a query in batch mode, e.g. "Fred Adair" -> "./fred_adair.txt".
+    """
+    slug = re.sub(r'\W+', '_', query.strip().lower()).strip('_') or 'query'
+    return os.path.join(output_dir, f"{slug}.txt")
+
+def unique_queries(queries):
+    """
+    Returns the queries without repeats, comparing them as the results cache does, so "Fred", "fred"
+    and "FRED " are one query. The first spelling of each query is kept.
+    """
+    seen = set()
+    unique = []
+    for query in queries:
+        key = normalize_query(query)
+        if key not in seen:
+            seen.add(key)
+            unique.append(query)
+    return unique
+
+def read_queries(path):
+    """
+    Reads one query per line from a file, skipping blank lines, comments and repeated queries.
+    """
+    queries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            query = line.strip()
+            if query and not query.startswith('#'):
+                queries.append(query)
+    return unique_queries(queries)
+
+def process_queries(queries, output_dir='.', max_queries=4, name_cache_path=None, name_cache_size=None,
+                    full_tree=False, fuzzy=False, min_confidence=None, stream=False, jsonl=False, incremental=False,
+                    compress=False, progress=False, consider_dates=True, workers=8, refresh=False, offline=False, cache_dir=default_cache_dir, cache_ttl=None):
+    """
+    Processes several queries concurrently in one process, writing the usual outputs for each query.
+
+    All queries share the name cache and the downloaded results cache. A record returned by several
+    queries (e.g. "fred" and "frederick") is downloaded and cleaned only once, and the same cleaned
+    entry is then grouped in each query's output. Cleaned entries are kept for the whole batch to
+    make this possible, so streaming does not bound memory here and the command line rejects it.
+    Incremental queries are updated from their own state instead and skip this sharing.
+
+    Args:
+        queries (list): The queries to search for. Repeats, compared as normalized queries, are processed once.
+        output_dir (str): The directory of the per-query outputs.
+        max_queries (int): The maximum number of queries processed at the same time.
+        The remaining arguments are the same as for process_query.
+
+    Returns:
+        dict: The number of entries of each query, or None for queries that failed.
+    """
+    configure_name_cache(name_cache_path, name_cache_size)
+    os.makedirs(output_dir, exist_ok=True)
+    # Repeated queries would write the same cache entry and output files at the same time
+    queries = unique_queries(queries)
+    # Record URI -> the entry as downloaded, passed to later downloads, and its cleaned copy
+    downloaded = {}
+    cleaned = {}
+    lock = threading.Lock()
+    reused = 0
+
+    def dedup_normalized(entries):
+        nonlocal reused
+        for entry in entries:
+            uri = entry.get('uri')
+            if uri is None:
+                yield normalize_entry(entry)
+                continue
+            with lock:
+                entry_cleaned = cleaned.get(uri)
+                if entry_cleaned is not None:
+                    reused += 1
+            if entry_cleaned is None:
+                # Cleaning changes the entry, and the downloaded one must stay as it is for the results cache
+                entry_cleaned = normalize_entry(dict(entry))
+                with lock:
+                    downloaded.setdefault(uri, entry)
+                    entry_cleaned = cleaned.setdefault(uri, entry_cleaned)
+            yield entry_cleaned
+
+    def run(query):
+        count = 0
+
+        def counted(entries):
+            nonlocal count
+            for entry in entries:
+                count += 1
+                yield entry
+
+        entries = load_entries(query, workers=workers, refresh=refresh, offline=offline, cache_dir=cache_dir,
+                               cache_ttl=cache_ttl, known=downloaded)
+        if incremental:
+            update_outputs(counted(entries), query_output_name(query, output_dir), min_confidence=min_confidence,
+                           jsonl=jsonl, compress=compress, progress=progress)
+            return count
+        entries = counted(dedup_normalized(entries))
+        if not stream:
+            entries = list(entries)
+        write_outputs(entries, query_output_name(query, output_dir), full_tree=full_tree, fuzzy=fuzzy,
+                      min_confidence=min_confidence, stream=stream, jsonl=jsonl, compress=compress, progress=progress,
+                      consider_dates=consider_dates)
+        return count
+
+    counts = {}
+    with ThreadPoolExecutor(max_queries) as executor:
+        futures = {query: executor.submit(run, query) for query in queries}
+        for query, future in futures.items():
+            try:
+                counts[query] = future.result()
+            except Exception as e:
+                print(f"Error processing '{query}': {e}")
+                counts[query] = None
+
+    failed = sum(1 for count in counts.values() if count is None)
+    print(f"Processed {len(queries)} queries ({failed} failed); {len(cleaned)} distinct records, "
+          f"{reused} shared between queries were reused.")
+    print_name_cache_stats()
+    return counts
 
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python separate.py <query> [output]")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Identify potentially overlapping person records for a Lux query.")
+    parser.add_argument("query", nargs="?", help="The Yale Lux Search query to process.")
+    parser.add_argument("output", nargs="?", default="output.txt", help="The output file name.")
+    parser.add_argument("--batch", metavar="FILE", help="Process every query in FILE (one per line) concurrently instead of a single query.")
+    parser.add_argument("--output-dir", default=".", help="Directory of the per-query outputs in batch mode.")
+    parser.add_argument("--max-queries", type=int, default=4, help="Maximum number of queries processed at the same time in batch mode.")
+    parser.add_argument("--full-tree", action="store_true", help="Also write the full name tree to the output file.")
+    parser.add_argument("--fuzzy", action="store_true", help="Group near-duplicate names, not only exact matches.")
+    parser.add_argument("--ignore-dates", dest="consider_dates", action="store_false", help="Keep name groups together even when their life dates cannot belong to one person.")
+    parser.add_argument("--min-confidence", type=float, help="Leave out overlap groups scoring below this match confidence (0-1).")
+    parser.add_argument("--stream", action="store_true", help="Stream entries through cleaning and grouping with bounded memory, spilling them to disk by surname.")
+    parser.add_argument("--jsonl", action="store_true", help="Also write the overlap groups as JSON records, one per line.")
+    parser.add_argument("--incremental", action="store_true", help="Update the outputs of the previous run, reprocessing only new or changed records.")
+    parser.add_argument("--entry-store", metavar="DIR", help="Directory of a memory-mapped store of the cleaned entries, loaded instead of downloading when it exists.")
+    parser.add_argument("--gzip", dest="compress", action="store_true", help="Gzip the full tree, overlap text and JSONL outputs, adding .gz to their names.")
+    parser.add_argument("--progress", action="store_true", help="Show progress bars while writing the outputs.")
+    parser.add_argument("--profile", action="store_true", help="Report the wall time, CPU time and counts of each stage.")
+    parser.add_argument("--profile-memory", action="store_true", help="Also report the peak memory of each stage with tracemalloc, which slows the stages down. Implies --profile.")
+    parser.add_argument("--profile-dir", metavar="DIR", help="Write a cProfile dump of each stage to DIR. Implies --profile.")
+    parser.add_argument("--trace", metavar="FILE", help="Write the stages to a JSON trace file for chrome://tracing or Perfetto. Implies --profile.")
+    parser.add_argument("--workers", type=int, default=8, help="Maximum number of concurrent download requests.")
+    cache_group = parser.add_mutually_exclusive_group()
+    cache_group.add_argument("--refresh", action="store_true", help="Download the results again even if they are cached.")
+    cache_group.add_argument("--offline", action="store_true", help="Only use cached results, without downloading anything.")
+    parser.add_argument("--cache-dir", default=default_cache_dir, help="Directory of the downloaded results cache.")
+    parser.add_argument("--no-cache", dest="cache_dir", action="store_const", const=None, help="Disable the downloaded results cache.")
+    parser.add_argument("--cache-ttl", type=float, help="Number of hours a cached result stays fresh. Defaults to one week.")
+    parser.add_argument("--name-cache", dest="name_cache_path", help="JSON file used to persist parsed names across runs.")
+    parser.add_argument("--name-cache-size", type=int, help="Maximum number of parsed names kept in the cache.")
+    args = parser.parse_args()
+    if args.stream and args.full_tree:
+        parser.error("--full-tree cannot be combined with --stream")
+    if args.incremental and (args.stream or args.full_tree or args.fuzzy or not args.consider_dates):
+        parser.error("--incremental cannot be combined with --stream, --full-tree, --fuzzy or --ignore-dates")
+    if args.entry_store and (args.stream or args.incremental or args.batch):
+        parser.error("--entry-store cannot be combined with --stream, --incremental or --batch")
+    profiling = args.profile or args.profile_memory or args.profile_dir or args.trace
+    if args.stream and args.batch:
+        parser.error("--stream cannot be combined with --batch")
+    if profiling and args.batch:
+        parser.error("--profile, --profile-memory, --profile-dir and --trace cannot be combined with --batch")
+    if not args.query and not args.batch:
+        parser.error("a query or --batch FILE is required")
 
-    query = sys.argv[1]
-    output = sys.argv[2] if len(sys.argv) > 2 else 'output.txt'
-    process_query(query, output)
+    options = dict(name_cache_path=args.name_cache_path, name_cache_size=args.name_cache_size,
+                   full_tree=args.full_tree, fuzzy=args.fuzzy, min_confidence=args.min_confidence,
+                   stream=args.stream, jsonl=args.jsonl, incremental=args.incremental, compress=args.compress,
+                   progress=args.progress, consider_dates=args.consider_dates, workers=args.workers, refresh=args.refresh, offline=args.offline,
+                   cache_dir=args.cache_dir, cache_ttl=args.cache_ttl)
+    try:
+        if args.batch:
+            process_queries(read_queries(args.batch), args.output_dir, max_queries=args.max_queries, **options)
+        else:
+            profiler = Profiler(profile_dir=args.profile_dir, trace_memory=args.profile_memory) if profiling \
+                else null_profiler
+            process_query(args.query, args.output, entry_store=args.entry_store, profiler=profiler, **options)
+            profiler.report()
+            if args.trace:
+                profiler.write_trace(args.trace)
+                print(f"Stage trace saved to {args.trace}")
+    except LookupError as e:
+        parser.exit(1, f"{e}\n")
@@ -0,0 +1,301 @@
+import json
+import time
+import argparse
+import threading
+import urllib.parse
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from src.cache import ResponseCache, default_cache_dir, normalize_query
+from src.clean import normalize_entries, name_cache
+from src.visualize import build_group_index, build_fuzzy_index, find_overlaps
+from separate import UriClusters, record_uris, load_entries, configure_name_cache, print_name_cache_stats
+
+mapping_fields = ('primary', 'related', 'group', 'confidence')
+
+
+class WarmCache:
+    """
+    A bounded in-memory LRU cache of computed results that expire after a TTL. Concurrent misses on
+    the same key are coalesced: the first caller computes the value and the others wait for it, so
+    identical requests arriving together cost a single computation. Failures are passed on to every
+    waiting caller and are not cached.
+
+    Args:
+        maxsize (int): The maximum number of results to keep. The least recently used are evicted first.
+        ttl (float): The number of seconds a result stays fresh, or None to keep it until it is evicted.
+    """
+
+    def __init__(self, maxsize=32, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        # Key -> (time stored, value)
+        self._values = OrderedDict()
+        # Key -> Future of the computation in flight
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._values)
+
+    def _lookup(self, key):
+        stored = self._values.get(key)
+        if stored is None:
+            return None
+        if self.ttl is not None and time.time() - stored[0] > self.ttl:
+            del self._values[key]
+            return None
+        self._values.move_to_end(key)
+        return stored[1]
+
+    def get(self, key, compute):
+        """
+        Returns the cached value of a key, computing it with compute() on a miss.
+
+        Args:
+            key: A hashable key.
+            compute (callable): Called without arguments to compute a missing value.
+
+        Returns:
+            The value.
+        """
+        with self._lock:
+            value = self._lookup(key)
+            if value is not None:
+                self.hits += 1
+                return value
+            pending = self._pending.get(key)
+            if pending is not None:
+                self.coalesced += 1
+            else:
+                self.misses += 1
+                future = self._pending[key] = Future()
+        if pending is not None:
+            return pending.result()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._pending[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._pending[key]
+            self._values[key] = (time.time(), value)
+            self._values.move_to_end(key)
+            while len(self._values) > self.maxsize:
+                self._values.popitem(last=False)
+                self.evictions += 1
+        future.set_result(value)
+        return value
+
+    def stats(self):
+        """
+        Returns the hit, miss, coalesced and eviction counts and the current size of the cache.
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'evictions': self.evictions,
+            'size': len(self._values),
+            'maxsize': self.maxsize,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class OverlapService:
+    """
+    Computes the overlap groups and URI mappings of queries, keeping the cleaned entries of each query
+    and the group index and overlap records of each query and grouping mode warm in memory between
+    requests. Name parses are kept in the shared name cache, and downloads in the on-disk results cache.
+
+    Args:
+        workers (int): The maximum number of concurrent download requests.
+        offline (bool): Whether to use only cached results, without downloading anything.
+        cache_dir (str): The directory of the downloaded results cache, or None to disable it.
+        cache_ttl (float): Optional number of hours downloaded and warm results stay fresh. Defaults to one week.
+        max_queries (int): The maximum number of queries kept warm.
+    """
+
+    def __init__(self, workers=8, offline=False, cache_dir=default_cache_dir, cache_ttl=None, max_queries=32):
+        self.workers = workers
+        self.offline = offline
+        self.cache_dir = cache_dir
+        self.cache_ttl = cache_ttl
+        ttl = cache_ttl * 3600 if cache_ttl is not None else ResponseCache().ttl
+        # Normalized query -> cleaned entries, shared by the exact and fuzzy groupings
+        self.entries = WarmCache(max_queries, ttl)
+        # (normalized query, fuzzy) -> group index and overlap records
+        self.indexes = WarmCache(2 * max_queries, ttl)
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def cleaned_entries(self, query):
+        """
+        Returns the cleaned entries of a query, downloading and cleaning them on a miss.
+        """
+        def compute():
+            return normalize_entries(load_entries(query, workers=self.workers, offline=self.offline,
+                                                  cache_dir=self.cache_dir, cache_ttl=self.cache_ttl))
+
+        return self.entries.get(normalize_query(query), compute)
+
+    def overlap_index(self, query, fuzzy=False):
+        """
+        Returns the group index and every overlap record of a query, grouping its entries on a miss.
+
+        Returns:
+            dict: The number of 'entries', the 'groups' index and the overlap 'records'.
+        """
+        def compute():
+            entries = self.cleaned_entries(query)
+            groups = build_fuzzy_index(entries) if fuzzy else build_group_index(entries)
+            return {'entries': len(entries), 'groups': groups, 'records': list(find_overlaps(groups))}
+
+        return self.indexes.get((normalize_query(query), fuzzy), compute)
+
+    def overlaps(self, query, fuzzy=False, min_confidence=None):
+        """
+        Returns the overlap groups of a query and the URI mappings of those groups.
+
+        Args:
+            query (str): The query to search for.
+            fuzzy (bool): Whether to group near-duplicate names together.
+            min_confidence (float): Optional match confidence below which overlap groups are left out.
+
+        Returns:
+            dict: The query options, the number of entries, the overlap records as 'groups', the
+            'mappings' from related to primary URIs as in the mapping CSV, and the time taken.
+
+        Raises:
+            LookupError: If the service is offline and the query is not cached.
+        """
+        with self._lock:
+            self.requests += 1
+        start = time.perf_counter()
+        index = self.overlap_index(query, fuzzy)
+        records = [record for record in index['records']
+                   if min_confidence is None or record['confidence'] >= min_confidence]
+
+        clusters = UriClusters()
+        for record in records:
+            clusters.add_group(record['name'], record_uris(record), record['confidence'])
+        return {
+            'query': query,
+            'fuzzy': fuzzy,
+            'min_confidence': min_confidence,
+            'entries': index['entries'],
+            'groups': records,
+            'mappings': [dict(zip(mapping_fields, row)) for row in clusters.rows()],
+            'seconds': round(time.perf_counter() - start, 3),
+        }
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'entries': self.entries.stats(),
+            'indexes': self.indexes.stats(),
+            'name_cache': name_cache.stats(),
+        }
+
+
+def parse_flag(value):
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """
+    Serves GET /overlaps?q=QUERY[&fuzzy=1][&min_confidence=SCORE] and GET /stats as JSON.
+    """
+
+    def send_json(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        params = {name: values[-1] for name, values in urllib.parse.parse_qs(url.query).items()}
+        service = self.server.service
+
+        if url.path == '/stats':
+            self.send_json(200, service.stats())
+            return
+        if url.path != '/overlaps':
+            self.send_json(404, {'error': f"Unknown path {url.path}"})
+            return
+
+        query = params.get('q', '').strip()
+        if not query:
+            self.send_json(400, {'error': "Missing query parameter 'q'"})
+            return
+        try:
+            min_confidence = float(params['min_confidence']) if 'min_confidence' in params else None
+        except ValueError:
+            self.send_json(400, {'error': "min_confidence must be a number"})
+            return
+
+        try:
+            body = service.overlaps(query, fuzzy=parse_flag(params.get('fuzzy', '')), min_confidence=min_confidence)
+        except LookupError as e:
+            self.send_json(404, {'error': str(e)})
+            return
+        except Exception as e:
+            print(f"Error processing '{query}': {e}")
+            self.send_json(500, {'error': str(e)})
+            return
+        self.send_json(200, body)
+
+
+def make_server(service, host='127.0.0.1', port=8000):
+    """
+    Returns an HTTP server answering requests with the given service, not yet serving.
+    """
+    server = ThreadingHTTPServer((host, port), ServiceHandler)
+    server.service = service
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the overlap groups and URI mappings of Lux queries as JSON, keeping caches warm between requests.")
+    parser.add_argument("--host", default="127.0.0.1", help="The address to listen on.")
+    parser.add_argument("--port", type=int, default=8000, help="The port to listen on.")
+    parser.add_argument("--lux-url", help="Base URL of the LuxY API to query instead of Yale Lux, e.g. a local lux_stub.py.")
+    parser.add_argument("--max-queries", type=int, default=32, help="Maximum number of queries kept warm in memory.")
+    parser.add_argument("--workers", type=int, default=8, help="Maximum number of concurrent download requests.")
+    parser.add_argument("--offline", action="store_true", help="Only use cached results, without downloading anything.")
+    parser.add_argument("--cache-dir", default=default_cache_dir, help="Directory of the downloaded results cache.")
+    parser.add_argument("--no-cache", dest="cache_dir", action="store_const", const=None, help="Disable the downloaded results cache.")
+    parser.add_argument("--cache-ttl", type=float, help="Number of hours cached and warm results stay fresh. Defaults to one week.")
+    parser.add_argument("--name-cache", dest="name_cache_path", help="JSON file used to persist parsed names across runs.")
+    parser.add_argument("--name-cache-size", type=int, help="Maximum number of parsed names kept in the cache.")
+    args = parser.parse_args()
+
+    if args.lux_url:
+        from src.download import set_lux_url
+
+        set_lux_url(args.lux_url)
+    configure_name_cache(args.name_cache_path, args.name_cache_size)
+    service = OverlapService(workers=args.workers, offline=args.offline, cache_dir=args.cache_dir,
+                             cache_ttl=args.cache_ttl, max_queries=args.max_queries)
+    server = make_server(service, args.host, args.port)
+    print(f"Serving overlaps at http://{args.host}:{server.server_address[1]}/overlaps?q=QUERY")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print_name_cache_stats()
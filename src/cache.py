@@ -0,0 +1,158 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+
+default_cache_dir = os.getenv("LUX_OVERLAPS_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "lux-overlaps"))
+
+
+def normalize_query(query):
+    """
+    Normalizes a query for use in a cache key, so "Tolkien " and "tolkien" share an entry.
+    """
+    return ' '.join(query.lower().split())
+
+
+class ResponseCache:
+    """
+    A content-addressed on-disk cache of downloaded LuxY entries. Each query is stored as a JSON lines
+    file named after the hash of its normalized query and filters. Results older than the TTL are
+    treated as missing, and the least recently used files are evicted once the cache exceeds its size limit.
+
+    Args:
+        cache_dir (str): The directory holding the cached files.
+        ttl (float): The number of seconds a cached result stays fresh.
+        max_bytes (int): The maximum total size of the cache.
+    """
+
+    def __init__(self, cache_dir=default_cache_dir, ttl=7 * 24 * 3600, max_bytes=1024 ** 3):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+    def key(self, query, filters=None):
+        """
+        Returns the content address of a query and its filters.
+        """
+        content = json.dumps({'query': normalize_query(query), 'filters': filters or {}}, sort_keys=True)
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def path(self, query, filters=None):
+        return os.path.join(self.cache_dir, f"{self.key(query, filters)}.jsonl")
+
+    def age(self, query, filters=None):
+        """
+        Returns the age in seconds of a cached result, or None if it is not cached.
+        """
+        try:
+            with open(self.path(query, filters), 'r', encoding='utf-8') as f:
+                return time.time() - json.loads(f.readline())['created']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def get(self, query, filters=None, allow_stale=False):
+        """
+        Returns the cached entries of a query, or None if they are missing or older than the TTL.
+
+        Args:
+            query (str): The query.
+            filters (dict): The filters applied to the query.
+            allow_stale (bool): Whether to return entries older than the TTL.
+
+        Returns:
+            list: The cached entries, or None.
+        """
+        age = self.age(query, filters)
+        if age is None or (age > self.ttl and not allow_stale):
+            return None
+        path = self.path(query, filters)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                f.readline()
+                entries = [json.loads(line) for line in f]
+            # Reads count as use for the eviction order
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted by another writer since its age was read
+            return None
+        return entries
+
+    def record(self, query, filters, entries):
+        """
+        Yields entries while writing them to the cache. The cached result only replaces an existing one
+        once every entry has been written, so an interrupted download never leaves a partial result.
+
+        Args:
+            query (str): The query.
+            filters (dict): The filters applied to the query.
+            entries (iterable): The downloaded entries.
+
+        Yields:
+            dict: Each entry, unchanged.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path(query, filters)
+        # Each writer gets its own temporary file, so concurrent writers of one key never share it
+        fd, temp_path = tempfile.mkstemp(prefix=f"{os.path.basename(path)}.", suffix='.tmp', dir=self.cache_dir)
+        try:
+            with open(fd, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({'query': normalize_query(query), 'filters': filters, 'created': time.time()}) + '\n')
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                    yield entry
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self.evict()
+
+    def put(self, query, filters, entries):
+        """
+        Stores the entries of a query in the cache.
+        """
+        for _ in self.record(query, filters, entries):
+            pass
+
+    def evict(self):
+        """
+        Removes the least recently used results until the cache fits its size limit. Expired results are
+        kept until then, so they remain available offline.
+
+        Returns:
+            int: The number of files removed.
+        """
+        try:
+            names = [name for name in os.listdir(self.cache_dir) if name.endswith('.jsonl')]
+        except OSError:
+            return 0
+        files = []
+        for name in names:
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        files.sort()
+
+        removed = 0
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        return removed
+
+    def clear(self):
+        """
+        Removes every cached result.
+        """
+        max_bytes, self.max_bytes = self.max_bytes, -1
+        self.evict()
+        self.max_bytes = max_bytes
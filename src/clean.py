@@ -1,23 +1,273 @@
 import re
-from nameparser import HumanName
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+
+date_pattern = re.compile(r', \b\d{4}(?:-\d{4})?\b')
+life_span_pattern = re.compile(r'\b(\d{4})-(\d{4})?(?!\d)')
+birth_pattern = re.compile(r'\bb\. (\d{4})\b')
+death_pattern = re.compile(r'\bd\. (\d{4})\b')
+abbreviation_pattern = re.compile(r'\b([A-Z])(\.)(?=[A-Z])')
+parenthetical_pattern = re.compile(r'\((.*?)\)')
+parenthetical_removal_pattern = re.compile(r'\(.*?\)')
+bracket_pattern = re.compile(r'[\[\]]')
+
+
+def _is_person(entry):
+    return 'name' in entry and entry['name'] and entry['type'] == 'person'
+
+
+def _standardize_abbreviation(name):
+    return abbreviation_pattern.sub(r'\1. ', name)
+
+
+def _remove_date(name):
+    return date_pattern.sub('', name).strip().rstrip('-').strip()
+
+
+def _life_dates(name):
+    """
+    Returns the (birth, death) years of a name such as "Adair, Fred Lyman, 1877-1972", "Adams, Fred, 1921-"
+    or "Smith, John, b. 1850", with None for a year the name does not give.
+    """
+    match = life_span_pattern.search(name)
+    if match:
+        return int(match.group(1)), int(match.group(2)) if match.group(2) else None
+    birth = birth_pattern.search(name)
+    death = death_pattern.search(name)
+    return int(birth.group(1)) if birth else None, int(death.group(1)) if death else None
+
+
+def _strip_parentheticals(name):
+    clean_name = parenthetical_removal_pattern.sub('', name).strip()
+    clean_name = bracket_pattern.sub('', clean_name).strip()
+    return clean_name.replace(' ,', '').strip()
+
+
+def _move_lastname(clean_name):
+    if ',' in clean_name:
+        last_name, rest_of_name = clean_name.split(',', 1)
+        return f"{rest_of_name.strip()} {last_name.strip()}"
+    return clean_name
+
+
+name_part_fields = ('last', 'first', 'middle', 'suffix', 'nickname')
+
+
+class NameCache:
+    """
+    A bounded LRU cache of HumanName parses keyed on the clean name, optionally backed by a JSON file
+    so parses can be reused across runs.
+
+    Args:
+        maxsize (int): The maximum number of names to keep. The least recently used names are evicted first.
+        path (str): Optional path of the on-disk store. It is loaded if it exists and written by save().
+    """
+
+    def __init__(self, maxsize=100000, path=None):
+        self.maxsize = maxsize
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Time spent in HumanName on misses
+        self.parse_seconds = 0.0
+        self._parts = OrderedDict()
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self):
+        return len(self._parts)
+
+    def parse(self, clean_name):
+        """
+        Returns the (last, first, middle, suffix, nickname) parts of a clean name, parsing it only on a miss.
+        """
+        with self._lock:
+            parts = self._parts.get(clean_name)
+            if parts is not None:
+                self._parts.move_to_end(clean_name)
+                self.hits += 1
+                return parts
+            self.misses += 1
+
+        # Imported on the first miss, so runs served from the cache never load nameparser
+        from nameparser import HumanName
+
+        start = time.perf_counter()
+        name_parts = HumanName(clean_name).as_dict()
+        parts = tuple(name_parts.get(field, None) for field in name_part_fields)
+        self._store(clean_name, parts, time.perf_counter() - start)
+        return parts
+
+    def _store(self, clean_name, parts, parse_seconds=0.0):
+        with self._lock:
+            self.parse_seconds += parse_seconds
+            self._parts[clean_name] = parts
+            self._parts.move_to_end(clean_name)
+            while len(self._parts) > self.maxsize:
+                self._parts.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        """
+        Returns the hit, miss and eviction counts, the time spent parsing and the current size of the cache.
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'parse_seconds': self.parse_seconds,
+            'size': len(self._parts),
+            'maxsize': self.maxsize,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._parts.clear()
+            self.hits = self.misses = self.evictions = 0
+            self.parse_seconds = 0.0
+
+    def load(self, path=None):
+        """
+        Loads parses from a JSON store written by save(). Loaded names count as least recently used.
+        """
+        path = path or self.path
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not load name cache from {path}: {e}")
+            return
+        for clean_name, parts in list(stored.items())[-self.maxsize:]:
+            self._store(clean_name, tuple(parts))
+
+    def save(self, path=None):
+        """
+        Writes the cached parses to a JSON store, replacing it atomically.
+        """
+        path = path or self.path
+        if not path:
+            return
+        with self._lock:
+            stored = {clean_name: list(parts) for clean_name, parts in self._parts.items()}
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(stored, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+
+name_cache = NameCache()
+
+
+def _set_name_parts(entry, clean_name, cache=None):
+    last, first, middle, suffix, nickname = (cache if cache is not None else name_cache).parse(clean_name)
+    entry['last_name'] = last
+    entry['first_name'] = first
+    entry['middle_name'] = middle
+    entry['suffix'] = suffix
+    entry['nickname'] = nickname
+
+
+def normalize_entry(entry, cache=None):
+    """
+    Runs every cleaning step on a single entry in one pass. This produces the same fields as calling
+    standardize_abbreviations, remove_dates, check_parentheses, extract_parentheticals,
+    remove_parentheticals, move_lastname and extract_name_parts in that order.
+
+    Args:
+        entry (dict): A dictionary containing the extracted data.
+        cache (NameCache): The cache used for name parsing. Defaults to the module-level name_cache.
+
+    Returns:
+        dict: The same dictionary with the cleaned fields added.
+    """
+    name = entry.get('name')
+    if not name:
+        return entry
+
+    name = _standardize_abbreviation(name)
+    entry['name'] = name
+    is_person = entry['type'] == 'person'
+
+    if is_person:
+        dates_removed = _remove_date(name)
+        entry['dates_removed'] = dates_removed
+        entry['birth_year'], entry['death_year'] = _life_dates(name)
+        entry['manual_review'] = name.count('(') != name.count(')')
+
+    entry['parentheticals'] = parenthetical_pattern.findall(name)
+
+    if not is_person:
+        return entry
+
+    if dates_removed:
+        dates_removed = dates_removed.replace(', (', ' (').strip()
+        entry['dates_removed'] = dates_removed
+        clean_name = _strip_parentheticals(dates_removed)
+    else:
+        name = name.replace(', (', ' (').strip()
+        entry['name'] = name
+        clean_name = _strip_parentheticals(name)
+
+    if clean_name:
+        clean_name = _move_lastname(clean_name)
+        _set_name_parts(entry, clean_name, cache)
+    entry['clean_name'] = clean_name
+
+    return entry
+
+
+def normalize_entries(entries, cache=None):
+    """
+    Cleans entries with a single pass per entry.
+
+    Args:
+        entries (iterable): Dictionaries containing the extracted data.
+        cache (NameCache): The cache used for name parsing. Defaults to the module-level name_cache.
+
+    Returns:
+        list: The updated dictionaries with all cleaned fields added.
+    """
+    return [normalize_entry(entry, cache) for entry in entries]
+
+
+def iter_normalized(entries, cache=None):
+    """
+    Cleans entries lazily, yielding each one as soon as it has been normalized.
+
+    Args:
+        entries (iterable): Dictionaries containing the extracted data.
+        cache (NameCache): The cache used for name parsing. Defaults to the module-level name_cache.
+
+    Yields:
+        dict: Each entry with all cleaned fields added.
+    """
+    for entry in entries:
+        yield normalize_entry(entry, cache)
+
 
 def remove_dates(entries):
     """
     Removes date patterns from the 'name' field in each entry and adds a new field 'dates_removed'.
+    The life dates are kept as numbers in 'birth_year' and 'death_year', None when not given.
 
     Args:
         entries (list): A list of dictionaries containing the extracted data.
 
     Returns:
-        list: The updated list of dictionaries with the 'dates_removed' field added.
+        list: The updated list of dictionaries with the 'dates_removed', 'birth_year' and 'death_year'
+        fields added.
     """
-    date_pattern = re.compile(r', \b\d{4}(?:-\d{4})?\b')
-
     for entry in entries:
-        if 'name' in entry and entry['name'] and entry['type'] == 'person':
-            entry['dates_removed'] = date_pattern.sub('', entry['name']).strip()
-            entry['dates_removed'] = entry['dates_removed'].rstrip('-').strip()
-
+        if _is_person(entry):
+            entry['dates_removed'] = _remove_date(entry['name'])
+            entry['birth_year'], entry['death_year'] = _life_dates(entry['name'])
 
     return entries
 
@@ -31,11 +281,9 @@ def standardize_abbreviations(entries):
     Returns:
         list: The updated list of dictionaries with standardized abbreviations in the 'name' field.
     """
-    abbreviation_pattern = re.compile(r'\b([A-Z])(\.)(?=[A-Z])')
-
     for entry in entries:
         if 'name' in entry and entry['name']:
-            entry['name'] = abbreviation_pattern.sub(r'\1. ', entry['name'])
+            entry['name'] = _standardize_abbreviation(entry['name'])
 
     return entries
 
@@ -52,10 +300,8 @@ def check_parentheses(entries):
         list: The updated list of dictionaries with the 'manual_review' field added.
     """
     for entry in entries:
-        if 'name' in entry and entry['name'] and entry['type'] == 'person':
-            open_parentheses = entry['name'].count('(')
-            close_parentheses = entry['name'].count(')')
-            entry['manual_review'] = open_parentheses != close_parentheses
+        if _is_person(entry):
+            entry['manual_review'] = entry['name'].count('(') != entry['name'].count(')')
 
     return entries
 
@@ -69,12 +315,9 @@ def extract_parentheticals(entries):
     Returns:
         list: The updated list of dictionaries with the 'parentheticals' field added.
     """
-    parenthetical_pattern = re.compile(r'\((.*?)\)')
-
     for entry in entries:
         if 'name' in entry and entry['name']:
-            parentheticals = parenthetical_pattern.findall(entry['name'])
-            entry['parentheticals'] = parentheticals
+            entry['parentheticals'] = parenthetical_pattern.findall(entry['name'])
 
     return entries
 
@@ -91,25 +334,14 @@ def remove_parentheticals(entries):
     Returns:
         list: The updated list of dictionaries with the 'clean_name' field added.
     """
-    
-    parenthetical_pattern = re.compile(r'\(.*?\)')
-    bracket_pattern = re.compile(r'[\[\]]')
-
     for entry in entries:
-        if 'name' in entry and entry['name'] and entry['type'] == 'person':
+        if _is_person(entry):
             if 'dates_removed' in entry and entry['dates_removed']:
                 entry['dates_removed'] = entry['dates_removed'].replace(', (', ' (').strip()
-                clean_name = parenthetical_pattern.sub('', entry['dates_removed']).strip()
-                clean_name = bracket_pattern.sub('', clean_name).strip()
-                clean_name = clean_name.replace(' ,', '').strip()
-
-                entry['clean_name'] = clean_name
+                entry['clean_name'] = _strip_parentheticals(entry['dates_removed'])
             else:
                 entry['name'] = entry['name'].replace(', (', ' (').strip()
-                clean_name = parenthetical_pattern.sub('', entry['name']).strip()
-                clean_name = bracket_pattern.sub('', clean_name).strip()
-                clean_name = clean_name.replace(' ,', '').strip()
-                entry['clean_name'] = clean_name
+                entry['clean_name'] = _strip_parentheticals(entry['name'])
 
     return entries
 
@@ -125,25 +357,20 @@ def move_lastname(entries):
     """
     for entry in entries:
         if 'clean_name' in entry and entry['clean_name'] and entry['type'] == 'person':
-            clean_name = entry['clean_name']
-            if ',' in clean_name:
-                parts = clean_name.split(',', 1)
-                if len(parts) == 2:
-                    last_name = parts[0].strip()
-                    rest_of_name = parts[1].strip()
-                    entry['clean_name'] = f"{rest_of_name} {last_name}"
+            entry['clean_name'] = _move_lastname(entry['clean_name'])
     return entries
 
 
 
 
-def extract_name_parts(entries):
+def extract_name_parts(entries, cache=None):
     """
     Extracts the component parts (first name, last name, middle name, etc.) from the clean_name field
-    of each person entry using the HumanName library.
+    of each person entry using the HumanName library. Parses are memoized in a NameCache.
 
     Args:
         entries (list): A list of dictionaries containing the extracted data.
+        cache (NameCache): The cache used for name parsing. Defaults to the module-level name_cache.
 
     Returns:
         list: The updated list of dictionaries with name parts (last_name, first_name, middle_name, 
@@ -151,11 +378,5 @@ def extract_name_parts(entries):
     """
     for entry in entries:
         if 'clean_name' in entry and entry['clean_name'] and entry['type'] == 'person':
-            name_parts = HumanName(entry['clean_name'])
-            name_parts = name_parts.as_dict()
-            entry['last_name'] = name_parts.get('last', None)
-            entry['first_name'] = name_parts.get('first', None)
-            entry['middle_name'] = name_parts.get('middle', None)
-            entry['suffix'] = name_parts.get('suffix', None)
-            entry['nickname'] = name_parts.get('nickname', None)
-    return entries
\ No newline at end of file
+            _set_name_parts(entry, entry['clean_name'], cache)
+    return entries
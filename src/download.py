@@ -1,55 +1,362 @@
-from tqdm import tqdm
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import itertools
+import random
+import threading
 import time
-import psycopg2
 import sys
 import os
 
-# Adjust paths for imports
+# The pipeline package lives next to the lux-overlaps checkout
 current_file = os.path.abspath(__file__)
 lux_overlaps_root = os.path.dirname(os.path.dirname(current_file))
 parent_dir = os.path.dirname(lux_overlaps_root)
-sys.path.insert(0, parent_dir)
-
-from dotenv import load_dotenv
-from pipeline.config import Config
-
-# Load environment variables and initialize configuration
-load_dotenv()
-basepath = os.getenv("LUX_BASEPATH", "")
-cfgs = Config(basepath=basepath)
-idmap = cfgs.get_idmap()
-cfgs.instantiate_all()
-
-db_config = {
-    "host": cfgs.caches["host"],
-    "port": cfgs.caches["port"],
-    "user": cfgs.caches["user"],
-    "password": cfgs.caches["password"],
-    "dbname": cfgs.caches["dbname"],
-}
+
+_cfgs = None
+_idmap = None
+_db_config = None
+_config_lock = threading.Lock()
+
+def get_config():
+    """
+    Return the pipeline Config, loading the environment and instantiating it on first use. Nothing is
+    loaded at import time, so commands that never touch the database start quickly.
+    """
+    global _cfgs, _idmap
+    with _config_lock:
+        if _cfgs is None:
+            if parent_dir not in sys.path:
+                sys.path.insert(0, parent_dir)
+            from dotenv import load_dotenv
+            from pipeline.config import Config
+
+            load_dotenv()
+            cfgs = Config(basepath=os.getenv("LUX_BASEPATH", ""))
+            _idmap = cfgs.get_idmap()
+            cfgs.instantiate_all()
+            _cfgs = cfgs
+        return _cfgs
+
+def get_db_config():
+    """Return the connection settings of the record caches database, reading them from the Config on first use."""
+    global _db_config
+    if _db_config is None:
+        caches = get_config().caches
+        _db_config = {
+            "host": caches["host"],
+            "port": caches["port"],
+            "user": caches["user"],
+            "password": caches["password"],
+            "dbname": caches["dbname"],
+        }
+    return _db_config
+
+def set_db_config(db_config):
+    """Use the given connection settings instead of reading the Config, e.g. in worker processes."""
+    global _db_config
+    _db_config = db_config
+
+def __getattr__(name):
+    # The former module-level settings, now created on first access
+    if name == "cfgs":
+        return get_config()
+    if name == "idmap":
+        get_config()
+        return _idmap
+    if name == "db_config":
+        return get_db_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+primary_name_id = "http://vocab.getty.edu/aat/300404670"
+
+# All caches included in the combined materialized view
+all_caches = ["ils", "ycba", "yuag", "ypm", "pmc", "ipch"]
+
+# Columns and unique index the code expects on the combined materialized view
+view_columns = {"name", "source_cache", "record_id", "name_index", "uri", "name_key", "surname_key"}
+view_key_index = "person_records_all_key"
+
+# Assigns a row to a shard by the hash of its surname key, given the shard count and the shard. The
+# int4 hash is cast to bigint before abs(), which would overflow on -2147483648 as an int4.
+shard_condition = "mod(abs(cast(hashtext(coalesce(surname_key, '')) AS bigint)), %s) = %s"
+
+# Rows fetched from the server per round trip when streaming query results
+fetch_batch_size = 10000
+
+# Seconds to wait for a LuxY response before the request is retried
+request_timeout = 30
+
+_session = None
+_pool = None
+_pool_lock = threading.Lock()
+_cursor_ids = itertools.count()
+
+def get_pool(max_connections=4):
+    """Return the connection pool shared by all database calls, creating it on first use."""
+    global _pool
+    import psycopg2.pool
+
+    db_config = get_db_config()
+    with _pool_lock:
+        if _pool is None or _pool.closed:
+            _pool = psycopg2.pool.ThreadedConnectionPool(1, max_connections, **db_config)
+        return _pool
+
+@contextmanager
+def pooled_connection():
+    """Borrow a connection from the shared pool, committing on success and rolling back on error."""
+    pool = get_pool()
+    conn = pool.getconn()
+    try:
+        with conn:
+            yield conn
+    finally:
+        pool.putconn(conn)
+
+def close_pool():
+    """Close every pooled connection."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and not _pool.closed:
+            _pool.closeall()
+        _pool = None
+
+def stream_query(sql_query, params=None, batch_size=None):
+    """
+    Run a query on a named server-side cursor and yield its rows in batches of fetchmany, so the client
+    only ever holds one batch in memory.
+    """
+    with pooled_connection() as conn:
+        with conn.cursor(name=f"lux_overlaps_{next(_cursor_ids)}") as cur:
+            cur.itersize = batch_size or fetch_batch_size
+            cur.execute(sql_query, params)
+            while True:
+                rows = cur.fetchmany(cur.itersize)
+                if not rows:
+                    break
+                yield from rows
+
+def with_retry(func, arg, retries=3, backoff=0.5):
+    """Call func(arg), retrying failed requests with exponential backoff and jitter."""
+    import requests
+
+    for attempt in range(retries + 1):
+        try:
+            return func(arg)
+        except (requests.RequestException, ValueError) as e:
+            if attempt == retries:
+                raise
+            delay = backoff * (2 ** attempt) * (1 + random.random())
+            print(f"Request for {arg} failed ({e}); retrying in {delay:.1f}s...")
+            time.sleep(delay)
+
+def get_session():
+    """
+    Return the HTTP session used to download LuxY pages and records, creating it on first use. It sends
+    the LuxY headers but, unlike the LuxY session, never retries by itself, so with_retry alone
+    decides how often a request is made.
+    """
+    global _session
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    with _pool_lock:
+        if _session is None:
+            from luxy.api import session as luxy_session
+
+            session = requests.Session()
+            session.headers.update(luxy_session.headers)
+            adapter = HTTPAdapter(pool_maxsize=32, max_retries=0)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+def fetch_json(url, timeout=None):
+    """
+    GET a LuxY URL and return its JSON. Unlike pg.get_page_data, the request times out, and HTTP
+    errors and timeouts are raised on the first attempt so with_retry can retry them.
+    """
+    response = get_session().get(url, timeout=timeout or request_timeout)
+    response.raise_for_status()
+    return response.json()
+
+def ordered_map(executor, func, items, max_pending):
+    """
+    Run func over items on the executor, yielding results in input order. At most max_pending calls
+    are in flight, so items are only pulled from the input as the consumer keeps up.
+    """
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(func, item))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def set_lux_url(base_url):
+    """
+    Point LuxY at another server, e.g. a local stub, given its base URL without the "/api" path.
+    The search config LuxY fetched from the previous server is dropped.
+    """
+    from luxy import api
+
+    base_url = base_url.rstrip("/")
+    api.config["lux_url"] = f"{base_url}/api"
+    api.config["lux_config"] = f"{base_url}/api/advanced-search-config"
+    api.clear_lux_config_cache()
+
+def record_to_entry(record):
+    """Build an entry with the record URI, primary name, type and first equivalent URI of a Linked Art record."""
+    names = [n for n in record.get("identified_by", []) if n.get("type") == "Name" and n.get("content")]
+    primary = next((n for n in names
+                    if any(c.get("id") == primary_name_id for c in n.get("classified_as", []))), None)
+    primary = primary or (names[0] if names else None)
+    equivalents = [e["id"] for e in record.get("equivalent", []) if e.get("id")]
+    return {
+        "uri": record.get("id"),
+        "name": primary["content"] if primary else record.get("_label"),
+        "type": record.get("type", "").lower(),
+        "equivalent": equivalents[0] if equivalents else None,
+    }
+
+def extract_luxy_entries(pg, max_workers=8, retries=3, backoff=0.5, known=None, timeout=None):
+    """
+    Fetch the result pages and record details of a LuxY query concurrently and yield one entry per record.
+
+    Pages and records are fetched on bounded thread pools with at most 2 * max_workers requests
+    pending, and entries are yielded in the same order as the search results.
+
+    Args:
+        pg: A LuxY query on which get() has been called.
+        max_workers (int): The maximum number of concurrent record requests.
+        retries (int): How many times to retry a failed request.
+        backoff (float): The base delay in seconds between retries, doubled on each attempt.
+        known (dict): Optional entries already downloaded, keyed by record URI. Their details are not fetched again.
+        timeout (float): Seconds to wait for each response. Defaults to request_timeout.
+
+    Yields:
+        dict: An entry with 'uri', 'name', 'type' and 'equivalent' fields.
+    """
+    from tqdm import tqdm
+
+    page_workers = max(1, min(4, max_workers // 2))
+    known = known if known is not None else {}
+    get_json = lambda url: fetch_json(url, timeout)
+    fetch = lambda url: with_retry(get_json, url, retries, backoff)
+    fetch_entry = lambda url: known.get(url) or record_to_entry(fetch(url))
+
+    with ThreadPoolExecutor(page_workers) as page_pool, ThreadPoolExecutor(max_workers) as record_pool:
+        pages = ordered_map(page_pool, fetch, pg.get_page_urls(), 2 * page_workers)
+        item_urls = (item["id"] for page in pages for item in pg.get_items(page))
+        entries = ordered_map(record_pool, fetch_entry, item_urls, 2 * max_workers)
+        yield from tqdm(entries, total=pg.num_results, desc="Downloading records")
 
 def materialized_view_exists(view_name):
     """Check if the materialized view exists in the public schema."""
-    sql_query = f"""
+    sql_query = """
         SELECT matviewname 
         FROM pg_matviews
-        WHERE schemaname = 'public' AND matviewname = '{view_name}';
+        WHERE schemaname = 'public' AND matviewname = %s;
     """
     try:
-        with psycopg2.connect(**db_config) as conn:
+        with pooled_connection() as conn:
             with conn.cursor() as cur:
-                cur.execute(sql_query)
+                cur.execute(sql_query, (view_name,))
                 result = cur.fetchone()
                 return result is not None  # Returns True if the view exists, False otherwise
     except Exception as e:
         print(f"Error checking materialized view existence: {e}")
         return False
 
-def create_combined_materialized_view(caches, refresh=False):
-    """Create or refresh a consolidated materialized view of all People across caches."""
+# SQL mirror of the src/clean.py rules. It standardizes initials, removes dates, parentheticals and
+# brackets, and moves a leading "Last," to the end. Titles and suffixes are dropped the way
+# HumanName drops them from the name parts. The key is the lowercased clean name plus the first
+# parenthetical. The key only approximates the HumanName grouping done client-side, so the candidate
+# groups of fetch_overlap_candidates are re-grouped in Python after they are fetched, e.g. by corpus.py.
+name_key_function_sql = r"""
+    CREATE OR REPLACE FUNCTION public.lux_name_key(name text) RETURNS text
+    LANGUAGE plpgsql IMMUTABLE PARALLEL SAFE AS $$
+    DECLARE
+        standardized text;
+        parenthetical text;
+        clean_name text;
+    BEGIN
+        standardized := regexp_replace(name, '\m([A-Z])\.(?=[A-Z])', '\1. ', 'g');
+        parenthetical := coalesce(substring(standardized from '\(([^)]*)\)'), '');
+
+        clean_name := btrim(rtrim(btrim(regexp_replace(standardized, ', \m\d{4}(-\d{4})?\M', '', 'g')), '-'));
+        clean_name := replace(clean_name, ', (', ' (');
+        clean_name := regexp_replace(clean_name, '\([^)]*\)', '', 'g');
+        clean_name := btrim(replace(translate(clean_name, '[]', ''), ' ,', ''));
+
+        IF position(',' IN clean_name) > 0 THEN
+            clean_name := btrim(substring(clean_name from position(',' IN clean_name) + 1))
+                || ' ' || btrim(split_part(clean_name, ',', 1));
+        END IF;
+
+        clean_name := regexp_replace(lower(clean_name), '\m(jr|sr|ii|iii|iv|mr|mrs|ms|dr|prof|rev|sir|esq)\M\.?', '', 'g');
+        clean_name := btrim(regexp_replace(translate(clean_name, ',', ' '), '\s+', ' ', 'g'));
+        RETURN clean_name || '|' || lower(btrim(parenthetical));
+    END;
+    $$;
+"""
+
+def index_exists(index_name):
+    """Check if an index exists in the public schema."""
+    sql_query = """
+        SELECT indexname
+        FROM pg_indexes
+        WHERE schemaname = 'public' AND indexname = %s;
+    """
+    try:
+        with pooled_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql_query, (index_name,))
+                return cur.fetchone() is not None
+    except Exception as e:
+        print(f"Error checking index existence: {e}")
+        return False
+
+def view_is_current():
+    """Check that the combined materialized view has every column and the unique key this module expects."""
+    sql_query = """
+        SELECT attname
+        FROM pg_attribute
+        WHERE attrelid = 'public.person_records_all'::regclass AND attnum > 0 AND NOT attisdropped;
+    """
+    try:
+        with pooled_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql_query)
+                columns = {row[0] for row in cur.fetchall()}
+    except Exception as e:
+        print(f"Error checking materialized view columns: {e}")
+        return False
+    return view_columns <= columns and index_exists(view_key_index)
+
+def create_combined_materialized_view(caches, refresh=False, rebuild=False):
+    """
+    Create or refresh a consolidated materialized view of all People across caches.
+
+    The view gets a unique key on (source_cache, record_id, name_index), which lets it be refreshed with
+    REFRESH MATERIALIZED VIEW CONCURRENTLY without blocking readers, and a pg_trgm GIN index on name,
+    which turns the ILIKE '%word%' lookups of fetch_combined_data into index scans. Each row also
+    carries the record uri, name_key, computed by lux_name_key at refresh time and indexed for
+    grouping, and surname_key, the last word of the clean name used to shard the corpus. A view
+    created before these columns and indexes existed is rebuilt once. Pass rebuild=True to drop and recreate
+    the view, e.g. after changing the list of caches.
+    """
     if materialized_view_exists("person_records_all"):
-        if refresh:
+        current = view_is_current()
+        if refresh and not rebuild and current:
+            refresh_combined_materialized_view()
+            return
+        elif refresh or rebuild:
             print("Refresh flag found. Recreating the combined materialized view...")
+        elif not current:
+            print("Combined materialized view is missing columns or indexes. Recreating it...")
         else:
             print("Combined materialized view already exists. Skipping creation.")
             return
@@ -60,28 +367,42 @@ def create_combined_materialized_view(caches, refresh=False):
         table_name = f"{cache}_record_cache"
         union_queries.append(f"""
             SELECT 
-                identified->>'content' AS name,
-                '{table_name}' AS source_cache
+                identified.value->>'content' AS name,
+                '{table_name}' AS source_cache,
+                {table_name}.identifier AS record_id,
+                identified.ordinality AS name_index,
+                {table_name}.data->>'id' AS uri,
+                public.lux_name_key(identified.value->>'content') AS name_key
             FROM {table_name},
-                 jsonb_array_elements(data->'identified_by') AS identified
+                 jsonb_array_elements(data->'identified_by') WITH ORDINALITY AS identified
             WHERE data->>'type' = 'Person'
               AND EXISTS (
                 SELECT 1 
-                FROM jsonb_array_elements(identified->'classified_as') AS classified
-                WHERE classified->>'id' = 'http://vocab.getty.edu/aat/300404670'
+                FROM jsonb_array_elements(identified.value->'classified_as') AS classified
+                WHERE classified->>'id' = '{primary_name_id}'
             )
         """)
 
     combined_query = " UNION ALL ".join(union_queries)
 
     sql_query = f"""
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        {name_key_function_sql}
         DROP MATERIALIZED VIEW IF EXISTS public.person_records_all;
         CREATE MATERIALIZED VIEW public.person_records_all AS
-        {combined_query};
+        SELECT combined.*, substring(combined.name_key from '([^ |]*)[|]') AS surname_key
+        FROM ({combined_query}) AS combined;
+        CREATE UNIQUE INDEX {view_key_index}
+            ON public.person_records_all (source_cache, record_id, name_index);
+        CREATE INDEX person_records_all_name_trgm
+            ON public.person_records_all USING gin (name gin_trgm_ops);
+        CREATE INDEX person_records_all_name_key
+            ON public.person_records_all (name_key);
+        ANALYZE public.person_records_all;
     """
 
     try:
-        with psycopg2.connect(**db_config) as conn:
+        with pooled_connection() as conn:
             with conn.cursor() as cur:
                 print("Executing creation of combined materialized view 'person_records_all'...")
                 cur.execute(sql_query)
@@ -90,9 +411,30 @@ def create_combined_materialized_view(caches, refresh=False):
     except Exception as e:
         print(f"Error creating combined materialized view: {e}")
 
+def refresh_combined_materialized_view():
+    """Refresh the combined materialized view in place while it stays readable."""
+    try:
+        with pooled_connection() as conn:
+            with conn.cursor() as cur:
+                print("Refreshing combined materialized view 'person_records_all' concurrently...")
+                start_time = time.time()
+                cur.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY public.person_records_all;")
+                conn.commit()
+                print(f"Combined materialized view refreshed in {time.time() - start_time:.2f} seconds.")
+    except Exception as e:
+        print(f"Error refreshing combined materialized view: {e}")
+
 
-def fetch_combined_data(query_word):
-    """Fetch all records sequentially from the combined materialized view."""
+def fetch_combined_data(query_word, batch_size=None):
+    """
+    Stream matching names from the combined materialized view.
+
+    Rows are read through a server-side cursor in batches of batch_size (fetch_batch_size by default),
+    so broad patterns stream with constant client memory.
+
+    Yields:
+        str: Each matching name.
+    """
     search_pattern = f"%{query_word}%"
     sql_query = """
         SELECT 
@@ -100,49 +442,125 @@ def fetch_combined_data(query_word):
         FROM person_records_all
         WHERE name ILIKE %s;
     """
-    results = []
+    count = 0
 
     try:
-        # Use the global db_config variable
-        with psycopg2.connect(**db_config) as conn:
-            with conn.cursor() as cur:
-                print(f"Executing fetch query from 'person_records_all' for '{query_word}'...")
-                start_time = time.time()
-                
-                # Execute the query with the search pattern
-                cur.execute(sql_query, (search_pattern,))
-                results = [row[0] for row in cur.fetchall()]
-                
-                end_time = time.time()
-                print(f"Query retrieved {len(results)} results in {end_time - start_time:.2f} seconds.")
+        print(f"Executing fetch query from 'person_records_all' for '{query_word}'...")
+        start_time = time.time()
+
+        for row in stream_query(sql_query, (search_pattern,), batch_size):
+            count += 1
+            yield row[0]
+
+        end_time = time.time()
+        print(f"Query retrieved {count} results in {end_time - start_time:.2f} seconds.")
     except Exception as e:
         print(f"Error fetching data from 'person_records_all': {e}")
-    
-    return results
+
+def fetch_overlap_candidates(query_word=None, batch_size=None, shard=None, shard_count=None):
+    """
+    Stream only the groups of names that share a normalized name key, grouping in the database so
+    names without a possible overlap are never sent to the client.
+
+    Args:
+        query_word (str): Optional word the names must contain. All names are grouped when omitted.
+        batch_size (int): Groups fetched per round trip (fetch_batch_size by default).
+        shard (int): Optional shard to group, from 0 to shard_count - 1, as in fetch_shard.
+        shard_count (int): The total number of shards when a shard is given.
+
+    Yields:
+        dict: A group with its 'key' and parallel lists of 'names', 'source_caches', 'record_ids' and 'uris'.
+    """
+    conditions, params = [], []
+    if query_word:
+        conditions.append("name ILIKE %s")
+        params.append(f"%{query_word}%")
+    if shard is not None:
+        conditions.append(shard_condition)
+        params.extend((shard_count, shard))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    sql_query = f"""
+        SELECT
+            name_key,
+            array_agg(name ORDER BY source_cache, record_id, name_index),
+            array_agg(source_cache ORDER BY source_cache, record_id, name_index),
+            array_agg(record_id ORDER BY source_cache, record_id, name_index),
+            array_agg(uri ORDER BY source_cache, record_id, name_index)
+        FROM person_records_all
+        {where}
+        GROUP BY name_key
+        HAVING count(*) > 1;
+    """
+    count = 0
+
+    try:
+        print(f"Executing grouped fetch from 'person_records_all' for '{query_word or '*'}'...")
+        start_time = time.time()
+
+        for key, names, source_caches, record_ids, uris in stream_query(sql_query, params or None, batch_size):
+            count += 1
+            yield {"key": key, "names": names, "source_caches": source_caches, "record_ids": record_ids,
+                   "uris": uris}
+
+        end_time = time.time()
+        print(f"Query retrieved {count} candidate groups in {end_time - start_time:.2f} seconds.")
+    except Exception as e:
+        print(f"Error fetching candidate groups from 'person_records_all': {e}")
+
+def fetch_shard(shard, shard_count, batch_size=None):
+    """
+    Stream every row of one shard of the combined materialized view. Rows are assigned to shards by a
+    hash of their normalized surname, so names that could overlap land in the same shard.
+
+    Args:
+        shard (int): The shard to fetch, from 0 to shard_count - 1.
+        shard_count (int): The total number of shards.
+        batch_size (int): Rows fetched per round trip (fetch_batch_size by default).
+
+    Yields:
+        tuple: (name, source_cache, record_id, uri) for each row in the shard.
+    """
+    sql_query = f"""
+        SELECT name, source_cache, record_id, uri
+        FROM person_records_all
+        WHERE {shard_condition};
+    """
+    yield from stream_query(sql_query, (shard_count, shard), batch_size)
 
 
 def main():
     if len(sys.argv) < 2:
-        print("Usage: python script.py <query_word> [--refresh]")
+        print("Usage: python script.py <query_word> [--refresh] [--rebuild] [--candidates]")
         sys.exit(1)
 
     # Extract query word and check if refresh is requested
     query_word = sys.argv[1]
     refresh_flag = "--refresh" in sys.argv
-
-    # Define the list of all caches to include in the combined view
-    all_caches = ["ils", "ycba", "yuag", "ypm", "pmc", "ipch"]  
+    rebuild_flag = "--rebuild" in sys.argv
+    candidates_flag = "--candidates" in sys.argv
 
     # Create the combined materialized view
     print("Checking on combined materialized view...")
-    create_combined_materialized_view(all_caches, refresh=refresh_flag)
+    create_combined_materialized_view(all_caches, refresh=refresh_flag, rebuild=rebuild_flag)
+
+    if candidates_flag:
+        print(f"Fetching candidate groups for '{query_word}' in combined materialized view...")
+        for group in fetch_overlap_candidates(query_word):
+            print(f"── {group['key']}")
+            for name, source_cache in zip(group["names"], group["source_caches"]):
+                print(f"   └── {name} ({source_cache})")
+        close_pool()
+        return
 
     print(f"Fetching records for '{query_word}' in combined materialized view...")
-    results = fetch_combined_data(query_word,)
+    results = fetch_combined_data(query_word)
+
+    print("Results:")
+    from tqdm import tqdm
 
-    print("Query completed. Results:")
     for name in tqdm(results, desc="Results"):
         print(f"{name}")
+    close_pool()
 
 if __name__ == "__main__":
     main()
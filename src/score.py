@@ -0,0 +1,194 @@
+import numpy as np
+
+# Feature weights for the pairwise similarity of two entries in a group
+weights = {
+    'last': 0.15,
+    'first': 0.3,
+    'middle': 0.1,
+    'initials': 0.15,
+    'parenthetical': 0.1,
+    'dates': 0.2,
+}
+
+# Factor applied to the similarity of two entries whose known life dates cannot belong to one person
+date_conflict_penalty = 0.25
+
+# Rows of the pairwise matrices computed at once, which bounds memory for very large groups
+batch_size = 1024
+
+name_fields = ('last', 'first', 'middle', 'parenthetical')
+
+
+def _token(part):
+    return part.replace('.', ' ').strip().lower() if part else ''
+
+
+def _bigrams(text):
+    """
+    Returns the set of character bigrams of a string. Only the start is padded, so a single letter is
+    one bigram and a prefix such as "fred" shares all of its bigrams with "frederick".
+    """
+    padded = f" {text}"
+    return {padded[i:i + 2] for i in range(len(text))}
+
+
+def _bigram_matrix(tokens):
+    """
+    Encodes the bigram sets of tokens as a binary matrix with one row per token and one column per
+    distinct bigram among them, so the bigrams shared by two tokens are counted exactly.
+
+    Returns:
+        tuple: The matrix and the number of bigrams in each row.
+    """
+    vocabulary = {}
+    rows = [[vocabulary.setdefault(gram, len(vocabulary)) for gram in _bigrams(token)] for token in tokens]
+    matrix = np.zeros((len(tokens), max(len(vocabulary), 1)), dtype=np.float32)
+    for i, columns in enumerate(rows):
+        matrix[i, columns] = 1.0
+    return matrix, np.array([len(columns) for columns in rows], dtype=np.int32)
+
+
+def entry_features(entries):
+    """
+    Encodes the name parts and life dates of a group of entries as arrays.
+
+    Args:
+        entries (list): A list of cleaned entries.
+
+    Returns:
+        dict: Bigram matrices and sizes, initials, years and duplicate ids, one row per entry.
+    """
+    tokens = {field: [] for field in name_fields}
+    birth, death, duplicates, signatures = [], [], [], {}
+    for entry in entries:
+        parentheticals = entry.get('parentheticals')
+        tokens['last'].append(_token(entry.get('last_name')))
+        tokens['first'].append(_token(entry.get('first_name')))
+        tokens['middle'].append(_token(entry.get('middle_name')))
+        tokens['parenthetical'].append(_token(parentheticals[0]) if parentheticals else '')
+        birth_year, death_year = entry.get('birth_year'), entry.get('death_year')
+        birth.append(float(birth_year) if birth_year is not None else np.nan)
+        death.append(float(death_year) if death_year is not None else np.nan)
+        # Entries with the same name parts and life dates share an id
+        signature = tuple(tokens[field][-1] for field in name_fields) + (birth_year, death_year)
+        duplicates.append(signatures.setdefault(signature, len(signatures)))
+
+    features = {}
+    for field in name_fields:
+        features[field], features[f'{field}_size'] = _bigram_matrix(tokens[field])
+    features.update({
+        'first_initial': np.array([ord(name[0]) if name else 0 for name in tokens['first']], dtype=np.int32),
+        'middle_initial': np.array([ord(name[0]) if name else 0 for name in tokens['middle']], dtype=np.int32),
+        'birth': np.array(birth),
+        'death': np.array(death),
+        'duplicate': np.array(duplicates, dtype=np.int32),
+    })
+    return features
+
+
+def _containment(features, field, rows):
+    """
+    Overlap coefficient of the bigram sets of a name part: the bigrams two names share over the
+    bigrams of the shorter one, so "fred" scores 1.0 against "frederick" and "albert" 0.5 against "robert".
+    """
+    matrix, sizes = features[field], features[f'{field}_size']
+    shared = matrix[rows] @ matrix.T
+    smallest = np.minimum(sizes[rows][:, None], sizes[None, :])
+    return np.divide(shared, smallest, out=np.zeros(shared.shape), where=smallest > 0)
+
+
+def _name_similarity(features, field, rows, missing):
+    """
+    Compares name parts, falling back to initials when either side is abbreviated to a single letter.
+    """
+    sim = _containment(features, field, rows)
+    sizes, initials = features[f'{field}_size'], features[f'{field}_initial']
+    left, right = initials[rows][:, None], initials[None, :]
+    abbreviated = (sizes[rows][:, None] <= 1) | (sizes[None, :] <= 1)
+    sim = np.where(abbreviated, (left == right).astype(float), sim)
+    return np.where((left == 0) | (right == 0), missing, sim)
+
+
+def _year_similarity(years, rows):
+    left, right = years[rows][:, None], years[None, :]
+    known = ~np.isnan(left) & ~np.isnan(right)
+    return np.where(known, (np.abs(left - right) <= 1).astype(float), np.nan), known
+
+
+def pairwise_similarity(features, rows=slice(None)):
+    """
+    Computes the weighted similarity of the given rows against every entry in the group. Exact
+    duplicates score 1.0, and pairs whose known birth or death years differ by more than a year are
+    scaled down by date_conflict_penalty.
+
+    Args:
+        features (dict): Arrays from entry_features.
+        rows (slice): The rows to compare.
+
+    Returns:
+        numpy.ndarray: A matrix of similarities between 0 and 1.
+    """
+    last_size = features['last_size']
+    last = np.where((last_size[rows][:, None] > 0) & (last_size[None, :] > 0),
+                    _containment(features, 'last', rows), 0.5)
+    first = _name_similarity(features, 'first', rows, missing=0.5)
+    middle = _name_similarity(features, 'middle', rows, missing=0.75)
+
+    first_initial, middle_initial = features['first_initial'], features['middle_initial']
+    initials = 0.5 * (first_initial[rows][:, None] == first_initial[None, :])
+    initials += 0.5 * ((middle_initial[rows][:, None] == middle_initial[None, :])
+                       | (middle_initial[rows][:, None] == 0) | (middle_initial[None, :] == 0))
+
+    parenthetical_size = features['parenthetical_size']
+    has_parenthetical = (parenthetical_size[rows][:, None] > 0) & (parenthetical_size[None, :] > 0)
+    parenthetical = np.where(has_parenthetical, _containment(features, 'parenthetical', rows), 1.0)
+
+    birth, birth_known = _year_similarity(features['birth'], rows)
+    death, death_known = _year_similarity(features['death'], rows)
+    compared = birth_known.astype(int) + death_known
+    dates = np.where(compared > 0, (np.nan_to_num(birth) + np.nan_to_num(death)) / np.maximum(compared, 1), 0.75)
+    conflict = (birth_known & (birth == 0)) | (death_known & (death == 0))
+
+    sim = (weights['last'] * last + weights['first'] * first + weights['middle'] * middle + weights['initials'] * initials
+           + weights['parenthetical'] * parenthetical + weights['dates'] * dates)
+    sim = np.where(conflict, sim * date_conflict_penalty, sim)
+    duplicate = features['duplicate']
+    return np.where(duplicate[rows][:, None] == duplicate[None, :], 1.0, sim)
+
+
+def group_confidence(entries):
+    """
+    Scores how likely it is that all entries in a group describe the same person, as the mean
+    pairwise similarity. Pairs are scored in batches of rows rather than one pair at a time.
+
+    Args:
+        entries (list): A list of cleaned entries.
+
+    Returns:
+        float: A confidence between 0 and 1. Groups with a single entry score 1.0.
+    """
+    count = len(entries)
+    if count < 2:
+        return 1.0
+    features = entry_features(entries)
+    total = 0.0
+    for start in range(0, count, batch_size):
+        rows = slice(start, min(start + batch_size, count))
+        sim = pairwise_similarity(features, rows)
+        # Only count each pair once, above the diagonal
+        upper = np.arange(rows.start, rows.stop)[:, None] < np.arange(count)[None, :]
+        total += sim[upper].sum()
+    return round(float(total / (count * (count - 1) / 2)), 3)
+
+
+def score_groups(groups):
+    """
+    Computes a confidence score for every overlap group in a group index.
+
+    Args:
+        groups (dict): A group index from build_group_index or build_fuzzy_index.
+
+    Returns:
+        dict: A mapping of group keys to confidence scores.
+    """
+    return {key: group_confidence(group) for key, group in groups.items() if len(group) > 1}
@@ -0,0 +1,83 @@
+import os
+import json
+import hashlib
+
+# Bump when the cleaning, grouping or scoring rules change, so an old state is not reused
+state_version = 5
+
+
+def entry_hash(entry):
+    """
+    Returns the content hash of a downloaded entry.
+    """
+    content = json.dumps(entry, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+def encode_key(key):
+    """
+    Returns a group key as a string usable as a JSON object key, e.g. '["Adair", "Fred", "L.", ""]'.
+    """
+    return json.dumps(list(key), ensure_ascii=False)
+
+
+def decode_key(key):
+    return tuple(json.loads(key))
+
+
+class RunState:
+    """
+    The state of the previous run of a query: the content hash and group key of every record, and
+    the overlap record of every overlap group. It lets a rerun clean and regroup only the records
+    that are new or changed, and reuse everything else.
+
+    Args:
+        path (str): The JSON file holding the state.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # Record id -> [content hash, encoded group key or None when the record is not grouped]
+        self.records = {}
+        # Encoded group key -> overlap record, for groups with two or more entries
+        self.groups = {}
+
+    def load(self):
+        """
+        Loads the state written by save(). A missing, unreadable or outdated state is left empty, so
+        the next run processes every record.
+
+        Returns:
+            bool: Whether a previous state was loaded.
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            print(f"Could not load run state from {self.path}: {e}")
+            return False
+        if stored.get('version') != state_version:
+            print(f"Ignoring run state from {self.path} written by another version.")
+            return False
+        self.records = stored['records']
+        self.groups = stored['groups']
+        return True
+
+    def save(self):
+        """
+        Writes the state to its JSON file, replacing it atomically.
+        """
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': state_version, 'records': self.records, 'groups': self.groups}, f,
+                      ensure_ascii=False)
+        os.replace(temp_path, self.path)
+
+    def iter_records(self):
+        """
+        Yields the stored overlap records in group key order, as written by find_overlaps.
+        """
+        for key in sorted(self.groups, key=decode_key):
+            yield self.groups[key]
@@ -0,0 +1,279 @@
+import os
+import json
+import shutil
+from collections.abc import Mapping
+import numpy as np
+
+# Bump when the layout of the stored columns changes
+store_version = 2
+
+# Cleaned fields stored as codes into the interned string table
+string_fields = ('name', 'uri', 'equivalent', 'dates_removed', 'clean_name',
+                 'last_name', 'first_name', 'middle_name', 'suffix', 'nickname')
+
+# Life dates stored as int16 years, -1 when missing
+year_fields = ('birth_year', 'death_year')
+
+
+class StoredEntry(Mapping):
+    """
+    A read-only view of one row of an EntryStore that behaves like a cleaned entry dictionary.
+    Values are decoded from the store when they are read. Missing values read as None.
+    """
+
+    __slots__ = ('store', 'row')
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    def __getitem__(self, field):
+        return self.store.value(self.row, field)
+
+    def __iter__(self):
+        return iter(self.store.fields)
+
+    def __len__(self):
+        return len(self.store.fields)
+
+    def __repr__(self):
+        return f"StoredEntry({dict(self)!r})"
+
+
+class EntryStore:
+    """
+    A columnar store of cleaned entries. Every string field is an int32 array of codes into one table
+    of interned strings, kept as a UTF-8 blob with offsets. Life dates are int16 years. type is a uint8 code into a small list of
+    types and manual_review an int8 (-1 when missing). Parentheticals are a list of string codes per
+    entry, with offsets. A store saved to a directory is loaded back memory-mapped, so nothing is
+    parsed and only the strings that are read get decoded.
+
+    Args:
+        blob (np.ndarray): The UTF-8 bytes of all interned strings.
+        string_offsets (np.ndarray): The start of each string in blob, plus the end of the last one.
+        columns (dict): An array of string codes per field in string_fields, -1 for missing values.
+        years (dict): An array of years per field in year_fields, -1 for missing years.
+        types (list): The type names the type codes refer to.
+        type_codes (np.ndarray): The type code of each entry.
+        manual_review (np.ndarray): 1, 0 or -1 (missing) per entry.
+        parentheticals (np.ndarray): The string codes of all parentheticals.
+        parenthetical_offsets (np.ndarray): The start of each entry's parentheticals, plus the end of the last.
+    """
+
+    fields = string_fields + year_fields + ('type', 'manual_review', 'parentheticals')
+
+    def __init__(self, blob, string_offsets, columns, years, types, type_codes, manual_review, parentheticals,
+                 parenthetical_offsets):
+        self.blob = blob
+        self.string_offsets = string_offsets
+        self.columns = columns
+        self.years = years
+        self.types = types
+        self.type_codes = type_codes
+        self.manual_review = manual_review
+        self.parentheticals = parentheticals
+        self.parenthetical_offsets = parenthetical_offsets
+
+    @classmethod
+    def from_entries(cls, entries):
+        """
+        Builds a store from cleaned entries, interning every string.
+
+        Args:
+            entries (iterable): Cleaned entries.
+
+        Returns:
+            EntryStore: The store.
+        """
+        # The empty string is always code 0, so a missing name part groups like an empty one
+        codes = {'': 0}
+        types = {}
+        columns = {field: [] for field in string_fields}
+        years = {field: [] for field in year_fields}
+        type_codes = []
+        manual_review = []
+        parentheticals = []
+        parenthetical_offsets = [0]
+
+        def intern(value):
+            return -1 if value is None else codes.setdefault(value, len(codes))
+
+        for entry in entries:
+            for field in string_fields:
+                columns[field].append(intern(entry.get(field)))
+            for field in year_fields:
+                year = entry.get(field)
+                years[field].append(-1 if year is None else year)
+            type_codes.append(types.setdefault(entry['type'], len(types)))
+            review = entry.get('manual_review')
+            manual_review.append(-1 if review is None else int(review))
+            parentheticals.extend(intern(value) for value in entry.get('parentheticals') or ())
+            parenthetical_offsets.append(len(parentheticals))
+
+        encoded = [value.encode('utf-8') for value in codes]
+        string_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=string_offsets[1:])
+        return cls(
+            np.frombuffer(b''.join(encoded), dtype=np.uint8),
+            string_offsets,
+            {field: np.array(values, dtype=np.int32) for field, values in columns.items()},
+            {field: np.array(values, dtype=np.int16) for field, values in years.items()},
+            list(types),
+            np.array(type_codes, dtype=np.uint8),
+            np.array(manual_review, dtype=np.int8),
+            np.array(parentheticals, dtype=np.int32),
+            np.array(parenthetical_offsets, dtype=np.int64),
+        )
+
+    def _arrays(self):
+        arrays = {f"column_{field}": column for field, column in self.columns.items()}
+        arrays.update((f"year_{field}", years) for field, years in self.years.items())
+        arrays.update(blob=self.blob, string_offsets=self.string_offsets, type_codes=self.type_codes,
+                      manual_review=self.manual_review, parentheticals=self.parentheticals,
+                      parenthetical_offsets=self.parenthetical_offsets)
+        return arrays
+
+    def save(self, path, source=None):
+        """
+        Writes the store to a directory of .npy files, replacing an existing store at that path.
+
+        Args:
+            path (str): The directory of the store.
+            source (dict): Optional description of what the entries were built from, e.g. the query and
+                filters, kept in meta.json so a later run can check it with matches().
+        """
+        temp_path = f"{path}.tmp"
+        shutil.rmtree(temp_path, ignore_errors=True)
+        os.makedirs(temp_path)
+        for name, array in self._arrays().items():
+            np.save(os.path.join(temp_path, f"{name}.npy"), array)
+        with open(os.path.join(temp_path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({'version': store_version, 'count': len(self), 'types': self.types, 'source': source}, f)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a store written by save(), memory-mapping its arrays.
+
+        Raises:
+            ValueError: If the store was written by another version.
+        """
+        with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != store_version:
+            raise ValueError(f"Entry store {path} was written by another version.")
+
+        def load_array(name):
+            # A plain ndarray view of the mapping avoids the per-access overhead of np.memmap
+            return np.asarray(np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r'))
+
+        return cls(
+            load_array('blob'),
+            load_array('string_offsets'),
+            {field: load_array(f"column_{field}") for field in string_fields},
+            {field: load_array(f"year_{field}") for field in year_fields},
+            meta['types'],
+            load_array('type_codes'),
+            load_array('manual_review'),
+            load_array('parentheticals'),
+            load_array('parenthetical_offsets'),
+        )
+
+    @staticmethod
+    def exists(path):
+        return os.path.exists(os.path.join(path, 'meta.json'))
+
+    @staticmethod
+    def matches(path, source):
+        """
+        Returns whether a store at path was written by this version from the given source.
+        """
+        try:
+            with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+        return meta.get('version') == store_version and meta.get('source') == source
+
+    def __len__(self):
+        return len(self.type_codes)
+
+    def __getitem__(self, row):
+        return StoredEntry(self, row)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield StoredEntry(self, row)
+
+    def string(self, code):
+        """
+        Decodes an interned string, or returns None for code -1.
+        """
+        if code < 0:
+            return None
+        return self.blob[self.string_offsets[code]:self.string_offsets[code + 1]].tobytes().decode('utf-8')
+
+    def value(self, row, field):
+        """
+        Returns the value of a field for one entry, as the cleaned entry dictionary would hold it.
+        """
+        if field in self.columns:
+            return self.string(int(self.columns[field][row]))
+        if field in self.years:
+            year = int(self.years[field][row])
+            return None if year < 0 else year
+        if field == 'type':
+            return self.types[self.type_codes[row]]
+        if field == 'manual_review':
+            review = int(self.manual_review[row])
+            return None if review < 0 else bool(review)
+        if field == 'parentheticals':
+            start, end = self.parenthetical_offsets[row], self.parenthetical_offsets[row + 1]
+            return [self.string(int(code)) for code in self.parentheticals[start:end]]
+        raise KeyError(field)
+
+    def group_index(self):
+        """
+        Groups the stored entries like build_group_index, comparing string codes instead of strings.
+        Only the strings of the group keys are decoded; entries are StoredEntry views.
+
+        Returns:
+            dict: A mapping of group keys to lists of entries, in first-seen order.
+        """
+        person = self.types.index('person') if 'person' in self.types else -1
+        rows = np.flatnonzero((self.type_codes == person) & (self.manual_review == 0))
+        if not len(rows):
+            return {}
+
+        # The first parenthetical of each entry, or the empty string
+        starts = self.parenthetical_offsets[:-1][rows]
+        has_parenthetical = self.parenthetical_offsets[1:][rows] > starts
+        first_parenthetical = np.zeros(len(rows), dtype=np.int32)
+        first_parenthetical[has_parenthetical] = self.parentheticals[starts[has_parenthetical]]
+
+        key_codes = [np.maximum(self.columns[field][rows], 0) for field in ('last_name', 'first_name', 'middle_name')]
+        key_codes.append(first_parenthetical)
+        # Sort rows by key, keeping input order within a key, and split where the key changes
+        order = np.lexsort(key_codes[::-1])
+        sorted_codes = np.stack([codes[order] for codes in key_codes], axis=1)
+        bounds = np.flatnonzero(np.any(sorted_codes[1:] != sorted_codes[:-1], axis=1)) + 1
+        bounds = np.concatenate(([0], bounds, [len(rows)]))
+        # Groups in the order of their first row, as build_group_index inserts them
+        first_rows = rows[order[bounds[:-1]]]
+
+        strings = {}
+
+        def decode(code):
+            value = strings.get(code)
+            if value is None:
+                value = strings[code] = self.string(code)
+            return value
+
+        index = {}
+        for group in np.argsort(first_rows, kind='stable').tolist():
+            start, end = bounds[group], bounds[group + 1]
+            key = tuple(decode(code) for code in sorted_codes[start].tolist())
+            index[key] = [StoredEntry(self, row) for row in rows[order[start:end]].tolist()]
+        return index
@@ -0,0 +1,145 @@
+import random
+
+surnames = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Miller", "Davis", "Wilson", "Anderson", "Taylor",
+    "Thomas", "Moore", "Martin", "Jackson", "Thompson", "White", "Harris", "Clark", "Lewis", "Robinson",
+    "Walker", "Young", "Allen", "King", "Wright", "Scott", "Hill", "Green", "Adams", "Baker", "Nelson",
+    "Carter", "Mitchell", "Roberts", "Turner", "Phillips", "Campbell", "Parker", "Evans", "Edwards",
+    "Collins", "Stewart", "Morris", "Rogers", "Reed", "Cook", "Morgan", "Bell", "Murphy", "Bailey",
+    "Cooper", "Richardson", "Cox", "Howard", "Ward", "Peterson", "Gray", "James", "Watson", "Brooks",
+    "Kelly", "Sanders", "Price", "Bennett", "Wood", "Barnes", "Ross", "Henderson", "Coleman", "Jenkins",
+    "Perry", "Powell", "Long", "Patterson", "Hughes", "Washington", "Butler", "Simmons", "Foster",
+    "Bryant", "Alexander", "Russell", "Griffin", "Hayes", "Myers", "Ford", "Hamilton", "Graham",
+    "Sullivan", "Wallace", "Woods", "Cole", "West", "Jordan", "Owens", "Reynolds", "Fisher", "Ellis",
+    "Harrison", "Gibson", "McDonald", "Cruz", "Marshall", "Gomez", "Murray", "Freeman", "Wells", "Webb",
+    "Tolkien", "Adair", "Abbott", "Ahlert", "Ainsworth", "Angermayer", "Anthoensen", "Astaire",
+    "Bartenstein", "Basolo", "Bergsten", "Besley", "Bishopp", "Breinersdorfer", "Bunnell", "Burnaby",
+    "Chappell", "Cogswell", "Colter", "Crawford", "D'Aguiar", "Dahmen", "Darvill", "Delmare", "Dervin",
+    "Düren", "Edmiston", "Eggan", "Erisman", "Fairchild", "Frohberg", "Funcken", "Gearing", "Guiol",
+    "Halliday", "Halsted", "Haslerud", "Hausman", "Hellems", "Hollows", "Hotson", "Householder",
+    "Kerlinger", "Kniffen", "Kober", "Korematsu", "Krinsky", "Lambert", "Lockley", "Longden",
+    "Lowenstein", "MacMurray", "McBagonluri", "McCuistion", "McDarrah", "Meldau", "Moavenzadeh",
+    "Moramarco", "Nancki", "Netsky", "Nicklason", "Oelssner", "Olayele", "Paronuzzi", "Peevy", "Phleger",
+    "Punzo", "Raphael", "Rippy", "Saberhagen", "Scheibe", "Shapley", "Shibley", "Shuttlesworth",
+    "Sinowatz", "Sirait", "Straffen", "Truxal", "Van Geest", "Vinson", "Wenstøp", "Yuill", "Zinneman",
+    "van der Linden", "de la Cruz", "St. Martin", "Müller", "García", "Núñez", "Østergaard", "Šimek",
+]
+
+first_names = [
+    "Fred", "Frederick", "Frederic", "George", "Martin", "John", "James", "William", "Charles", "Henry",
+    "Thomas", "Edward", "Richard", "Robert", "Joseph", "Albert", "Arthur", "Harold", "Walter", "Samuel",
+    "Mary", "Elizabeth", "Anna", "Margaret", "Sarah", "Emily", "Alice", "Helen", "Ruth", "Florence",
+    "Karl", "Ludwig", "Pierre", "Jean", "Georges", "Hans", "Johann", "Friedrich", "Giovanni", "Carlos",
+    "Alan", "Peter", "Paul", "David", "Michael", "Daniel", "Francis", "Louis", "Hugh", "Ronald",
+    "Evelyn", "Hilmar", "Erastus", "Crayton", "Dayton", "Towsley", "Mustard", "Boughton", "Cheffins",
+]
+
+middle_names = [
+    "", "", "", "Lyman", "Hull", "Washington", "Louis", "Gordon", "Walter", "Adelbert", "Nichols",
+    "Porter", "Gilbert", "Stanley", "King", "Le Roy", "Brenning", "Ronald Reuel", "Alexander", "Victor",
+    "Whitney", "Ellsworth", "Motte", "Russell", "Curtis", "Edward", "Ernest", "Kenneth", "Abraham", "Marie",
+]
+
+roles = ["Painter", "Photographer", "Erotic literature writer", "Engraver", "Printer", "Architect", "Composer"]
+
+places = ["of Glasgow", "of London", "of New Haven", "vicomte", "Sir", "Saint"]
+
+equivalent_prefixes = [
+    "http://id.loc.gov/authorities/names/n", "http://viaf.org/viaf/", "http://www.wikidata.org/entity/Q",
+    "https://linked-art.library.yale.edu/node/", "https://media.art.yale.edu/content/lux/agt/",
+    "http://vocab.getty.edu/ulan/", "https://d-nb.info/gnd/",
+]
+
+def _initials(name):
+    return ' '.join(f"{part[0]}." for part in name.split())
+
+
+def _person(rng):
+    """
+    Draws one synthetic person. Surnames follow a Zipf-like distribution, so common surnames collect
+    many people as in real result sets.
+    """
+    surname = surnames[min(int(rng.paretovariate(0.8)) - 1, len(surnames) - 1)] if rng.random() < 0.6 \
+        else rng.choice(surnames)
+    birth = rng.randint(1600, 1990)
+    return {
+        "last": surname,
+        "first": rng.choice(first_names),
+        "middle": rng.choice(middle_names),
+        "birth": birth,
+        "death": birth + rng.randint(20, 95) if birth < 1950 and rng.random() < 0.7 else None,
+    }
+
+
+def _render(person, rng):
+    """
+    Renders a person as one of the name forms found in LuxY results, e.g. "Adair, Fred Lyman, 1877-1972",
+    "Piper, F. L. (Fred Le Roy), 1858-1940", "[Smith, John]" or "Fred Adair".
+    """
+    last, first, middle = person["last"], person["first"], person["middle"]
+    full_first = f"{first} {middle}".strip()
+    dates = f"{person['birth']}-{person['death'] or ''}"
+    form = rng.random()
+    if form < 0.25:
+        return f"{last}, {full_first}, {dates}"
+    if form < 0.35:
+        return f"{last}, {full_first}"
+    if form < 0.45:
+        # Initials with the full names as a parenthetical
+        return f"{last}, {_initials(full_first)} ({full_first}), {dates}"
+    if form < 0.50:
+        # Initials without spaces, e.g. "F.L."
+        return f"{last}, {_initials(full_first).replace(' ', '')}"
+    if form < 0.58:
+        return f"{full_first} {last}"
+    if form < 0.64:
+        return f"{last}, {first} {_initials(middle)}".strip()
+    if form < 0.70:
+        return f"{last}, {full_first}, {rng.choice(['b.', 'd.', 'active'])} {person['birth']}"
+    if form < 0.75:
+        return f"[{last}, {full_first}]"
+    if form < 0.80:
+        return f"{last}, {full_first} ({rng.choice(roles)})"
+    if form < 0.84:
+        return f"{last}, {full_first}, {rng.choice(['Jr.', 'Sr.', 'III'])}, {dates}"
+    if form < 0.88:
+        return f"{last}, {full_first}, {rng.choice(places)}"
+    if form < 0.91:
+        return f"{last}, {full_first}, {person['birth']} or {person['birth'] + 1}-{person['death'] or ''}"
+    if form < 0.92:
+        # Unbalanced parentheses, flagged for manual review
+        return f"{last}, {_initials(full_first)} ({full_first}, {dates}"
+    if form < 0.95:
+        return f"{last}, {_initials(full_first)}"
+    return f"{last[0]}., {first}, {dates}"
+
+
+def generate_entries(count, seed=0):
+    """
+    Generates synthetic LuxY-style person entries. Each synthetic person is rendered in one or more
+    random name forms (half of them once, a few up to ten times), so the corpus has realistic overlaps.
+
+    Args:
+        count (int): The number of entries.
+        seed (int): The random seed, so every run generates the same corpus.
+
+    Returns:
+        list: Entries with a uri, name, type and, for most, an equivalent URI, in random order.
+    """
+    rng = random.Random(seed)
+    names = []
+    while len(names) < count:
+        person = _person(rng)
+        variants = 1
+        while variants < 10 and rng.random() < 0.5:
+            variants += 1
+        names.extend(_render(person, rng) for _ in range(min(variants, count - len(names))))
+    rng.shuffle(names)
+
+    entries = []
+    for i, name in enumerate(names):
+        entry = {"uri": f"https://lux.collections.yale.edu/data/person/{i:08x}", "name": name, "type": "person"}
+        if rng.random() < 0.7:
+            entry["equivalent"] = f"{rng.choice(equivalent_prefixes)}{rng.randrange(10 ** 8)}"
+        entries.append(entry)
+    return entries
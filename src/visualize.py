@@ -1,101 +1,766 @@
-from anytree import Node
+import os
+import gzip
+import json
+import zlib
+import heapq
+import bisect
+import tempfile
 import itertools
+import unicodedata
+from anytree import Node
 from anytree.render import RenderTree
 
-def create_tree(entries, consider_dates=True):
+def _is_eligible(entry):
+    return entry['type'] == 'person' and entry["manual_review"] == False
+
+def group_key(entry):
+    """
+    Returns the (last, first, middle, parenthetical) key used to group an entry.
+    """
+    parentheticals = entry.get('parentheticals')
+    return (entry['last_name'] or '', entry['first_name'] or '', entry['middle_name'] or '', parentheticals[0] if parentheticals else '')
+
+def entry_group_key(entry):
+    """
+    Returns the group key of a cleaned entry, or None if build_group_index leaves it out.
+    """
+    return group_key(entry) if _is_eligible(entry) else None
+
+def build_group_index(entries):
+    """
+    Groups entries in a single pass into a dictionary keyed by (last, first, middle, parenthetical).
+    Entries within a group keep their input order.
+
+    Args:
+        entries (list | EntryStore): A list of dictionaries containing the extracted data, or a store of
+            cleaned entries, which is grouped on its string codes.
+
+    Returns:
+        dict: A mapping of group keys to lists of entries.
+    """
+    # An EntryStore groups itself on its string codes
+    if hasattr(entries, 'group_index'):
+        return entries.group_index()
+    index = {}
+    for entry in entries:
+        if _is_eligible(entry):
+            key = group_key(entry)
+            group = index.get(key)
+            if group is None:
+                index[key] = [entry]
+            else:
+                group.append(entry)
+    return index
+
+soundex_codes = {letter: digit for digit, letters in (('1', 'BFPV'), ('2', 'CGJKQSXZ'), ('3', 'DT'),
+                                                     ('4', 'L'), ('5', 'MN'), ('6', 'R')) for letter in letters}
+
+def phonetic_key(surname, length=4):
+    """
+    Returns the Soundex code of a surname, e.g. "Adair" -> "A360". Accents are folded before coding.
+    With length=None the code is neither padded nor truncated, which keeps long surnames apart.
+    """
+    letters = [c for c in unicodedata.normalize('NFKD', surname).upper() if 'A' <= c <= 'Z']
+    if not letters:
+        return surname.lower()
+    code = letters[0]
+    previous = soundex_codes.get(letters[0], '')
+    for letter in letters[1:]:
+        digit = soundex_codes.get(letter, '')
+        if digit and digit != previous:
+            code += digit
+        if letter not in 'HW':
+            previous = digit
+    return (code + '000')[:length] if length else code
+
+def _name_token(part):
+    return part.replace('.', ' ').split()[0].lower() if part and part.replace('.', '').strip() else ''
+
+def _find(parents, i):
+    while parents[i] != i:
+        parents[i] = parents[parents[i]]
+        i = parents[i]
+    return i
+
+def _union(parents, i, j):
+    i, j = _find(parents, i), _find(parents, j)
+    if i != j:
+        parents[max(i, j)] = min(i, j)
+
+def build_fuzzy_index(entries):
     """
-    Creates a tree structure from a list of entries.
+    Groups near-duplicate names such as "Fred Lyman Adair", "F. L. Adair" and "Frederick L. Adair" using
+    blocking keys instead of pairwise comparison, so the cost grows linearly with the number of entries.
+
+    Exact groups from build_group_index are linked when they share a blocking key:
+        - full first names share a key on (surname, leading trigram of the first name, middle initial);
+        - first names given as initials share a key on (surname, initials signature).
+    An initials block joins the one full-name block with its initials signature. When several full-name
+    blocks have that signature, e.g. "H. Smith" with "Helen Smith" and "Hugh Smith", the blocks stay
+    apart and a copy of each initials-only entry is added to every one of them, marked as a candidate,
+    so the initials never link different people.
+    Surnames are compared by their first two letters and full-length Soundex code.
 
     Args:
         entries (list): A list of dictionaries containing the extracted data.
-        consider_dates (bool): Whether to consider dates in the tree structure.
+
+    Returns:
+        dict: A mapping of group keys to lists of entries, in the same form as build_group_index. Each
+              candidate group is keyed by its most complete name, and its candidate entries follow
+              its own entries with 'candidate' set.
+    """
+    exact = build_group_index(entries)
+    keys = list(exact)
+    parents = list(range(len(keys)))
+    # Initials signature -> the first group of each full-name block, and of the initials block
+    full_blocks = {}
+    initials_blocks = {}
+
+    for i, (last_name, first_name, middle_name, _) in enumerate(keys):
+        first = _name_token(first_name)
+        if not last_name or not first:
+            continue
+        surname = (last_name[:2].lower(), phonetic_key(last_name, length=None))
+        middle = _name_token(middle_name)[:1]
+        initials = (surname, first[0], middle)
+        if len(first) == 1:
+            _union(parents, i, initials_blocks.setdefault(initials, i))
+        else:
+            blocks = full_blocks.setdefault(initials, {})
+            _union(parents, i, blocks.setdefault(first[:3], i))
+
+    # Initials block root -> the roots of the several full-name blocks it is a candidate for
+    candidates = {}
+    for initials, anchor in initials_blocks.items():
+        blocks = list(full_blocks.get(initials, {}).values())
+        if len(blocks) == 1:
+            _union(parents, anchor, blocks[0])
+        elif blocks:
+            candidates[_find(parents, anchor)] = [_find(parents, block) for block in blocks]
+
+    components = {}
+    for i in range(len(keys)):
+        components.setdefault(_find(parents, i), []).append(keys[i])
+
+    roots = {}
+    for root, members in components.items():
+        if root in candidates:
+            continue
+        members.sort()
+        representative = max(members, key=lambda key: (len(key[1]) + len(key[2]), len(exact[key])))
+        group = []
+        for key in members:
+            group.extend(exact[key])
+        roots[root] = (representative, group)
+
+    for root, blocks in candidates.items():
+        copies = [{**entry, 'candidate': True} for key in sorted(components[root]) for entry in exact[key]]
+        for block in blocks:
+            roots[block][1].extend(copies)
+    return dict(roots.values())
+
+# Years by which two life dates may differ and still belong to one person
+year_tolerance = 1
+
+def _year_runs(items, tolerance):
+    """
+    Sorts (year, position) pairs and splits them into runs of years that can belong to one person. A
+    run is split where two consecutive years are more than tolerance apart, and chaining is bounded by
+    the run's full width: a year starts a new run when it is more than 2 * tolerance after the run's
+    first year, so every year of a run is within tolerance of its middle.
+    """
+    runs = []
+    first = previous = None
+    for year, position in sorted(items):
+        if first is None or year - previous > tolerance or year - first > 2 * tolerance:
+            runs.append([])
+            first = year
+        runs[-1].append(position)
+        previous = year
+    return runs
+
+def _fits(low, high, year, tolerance):
+    """
+    Returns whether a year can join a run of years from low to high: it is within tolerance of the
+    run and the run stays at most 2 * tolerance wide.
+    """
+    return low - tolerance <= year <= high + tolerance and max(high, year) - min(low, year) <= 2 * tolerance
+
+def life_span_clusters(entries, tolerance=year_tolerance):
+    """
+    Splits a group of entries into clusters whose life dates can all belong to one person. Dates are
+    kept together while they are within tolerance of their neighbours, and a cluster's birth and
+    death years each span at most 2 * tolerance years, so close years such as 1900, 1901 and 1902 stay
+    together without chaining arbitrarily far. Sorted indexes of the clusters are used instead of
+    comparing every pair:
+        - closed ranges such as "1877-1972" are sorted and join the first cluster whose birth and
+          death years they fit, or start a new one;
+        - open-ended ranges such as "1921-" join the closed cluster whose birth years they fit when
+          exactly one does, and are split into runs of birth years otherwise;
+        - entries with only a death year join the closed cluster whose death years they fit when
+          exactly one does, and are split into runs of death years otherwise;
+        - undated entries join the only dated cluster, and form their own cluster otherwise.
+    Sorting dominates, so a group of n entries is split in O(n log n) when few clusters overlap.
+
+    Args:
+        entries (list): The entries of one group, with 'birth_year' and 'death_year' fields.
+        tolerance (int): The number of years two dates may differ by.
+
+    Returns:
+        list: (life span, entries) pairs, where the life span labels a dated cluster, e.g. "1921-",
+        "1877-1972" or "d. 1900", and is '' for the undated cluster. Entries keep their input order.
+    """
+    closed, open_ended, died, undated = [], [], [], []
+    for position, entry in enumerate(entries):
+        birth, death = entry.get('birth_year'), entry.get('death_year')
+        if birth is not None and death is not None:
+            closed.append((birth, death, position))
+        elif birth is not None:
+            open_ended.append((birth, position))
+        elif death is not None:
+            died.append((death, position))
+        else:
+            undated.append(position)
+
+    # The clusters of closed ranges come first, in the order of their earliest birth years. Each
+    # keeps the [low, high] range of its birth and of its death years.
+    clusters = []
+    first_births, births, deaths = [], [], []
+    for birth, death, position in sorted(closed):
+        start = bisect.bisect_left(first_births, birth - 2 * tolerance)
+        for i in range(start, len(clusters)):
+            if _fits(*births[i], birth, tolerance) and _fits(*deaths[i], death, tolerance):
+                clusters[i].append(position)
+                births[i][1] = birth
+                deaths[i] = [min(deaths[i][0], death), max(deaths[i][1], death)]
+                break
+        else:
+            clusters.append([position])
+            first_births.append(birth)
+            births.append([birth, birth])
+            deaths.append([death, death])
+
+    unmatched = []
+    for birth, position in open_ended:
+        start = bisect.bisect_left(first_births, birth - 2 * tolerance)
+        end = bisect.bisect_right(first_births, birth + tolerance)
+        fitting = [i for i in range(start, end) if _fits(*births[i], birth, tolerance)]
+        if len(fitting) == 1:
+            clusters[fitting[0]].append(position)
+        else:
+            unmatched.append((birth, position))
+    clusters.extend(_year_runs(unmatched, tolerance))
+
+    if died:
+        # The closed clusters sorted by their earliest death year
+        by_death = sorted(range(len(deaths)), key=lambda i: deaths[i][0])
+        first_deaths = [deaths[i][0] for i in by_death]
+        unmatched = []
+        for death, position in died:
+            start = bisect.bisect_left(first_deaths, death - 2 * tolerance)
+            end = bisect.bisect_right(first_deaths, death + tolerance)
+            fitting = [by_death[j] for j in range(start, end) if _fits(*deaths[by_death[j]], death, tolerance)]
+            if len(fitting) == 1:
+                clusters[fitting[0]].append(position)
+            else:
+                unmatched.append((death, position))
+        clusters.extend(_year_runs(unmatched, tolerance))
+
+    if len(clusters) == 1:
+        clusters[0].extend(undated)
+        undated = []
+
+    result = []
+    for cluster in clusters:
+        cluster.sort()
+        cluster_births = [entries[position]['birth_year'] for position in cluster
+                          if entries[position].get('birth_year') is not None]
+        cluster_deaths = [entries[position]['death_year'] for position in cluster
+                          if entries[position].get('death_year') is not None]
+        if cluster_births:
+            span = f"{min(cluster_births)}-{min(cluster_deaths) if cluster_deaths else ''}"
+        else:
+            span = f"d. {min(cluster_deaths)}"
+        result.append((span, [entries[position] for position in cluster]))
+    if undated:
+        result.append(('', [entries[position] for position in undated]))
+    return result
+
+def split_life_spans(index, tolerance=year_tolerance):
+    """
+    Splits every group of an index whose life dates cannot all belong to one person, with
+    life_span_clusters. The dated clusters of a split group are keyed by the group key plus their life
+    span, e.g. ("Adams", "Fred", "", "", "1921-"), and its undated entries keep the group key. Groups
+    whose dates agree are kept as they are.
+
+    Args:
+        index (dict): A group index from build_group_index or build_fuzzy_index.
+        tolerance (int): The number of years two dates may differ by.
+
+    Returns:
+        dict: The split group index.
+    """
+    split = {}
+    for key, group in index.items():
+        clusters = life_span_clusters(group, tolerance) if len(group) > 1 else ()
+        if len(clusters) < 2:
+            split[key] = group
+            continue
+        for span, entries in clusters:
+            split.setdefault(key + (span,) if span else key, []).extend(entries)
+    return split
+
+def base_name(key):
+    """
+    Returns the display name of a group key, e.g. "Fred H. Abbott (Fred Hull)", or "Fred Adams, 1921-"
+    for a group split by life dates.
+    """
+    last_name, first_name, middle_name, parenthetical = key[:4]
+    if parenthetical:
+        name = ' '.join(f"{first_name} {middle_name} {last_name} ({parenthetical})".split())
+    else:
+        name = ' '.join(f"{first_name} {middle_name} {last_name}".split())
+    return f"{name}, {key[4]}" if len(key) > 4 else name
+
+def entry_display_name(entry):
+    return f"{entry['name']} (equivalent: {entry['equivalent']})" if entry.get('equivalent') else entry['name']
+
+def group_equivalent(key, group):
+    """
+    Returns the equivalent of the entry whose name is exactly the group's display name, if any. The
+    life span of a split group is not part of the compared name.
+    """
+    name = base_name(key[:4])
+    return next((entry['equivalent'] for entry in group
+                 if entry.get('equivalent') and entry['name'] == name and not entry.get('candidate')), None)
+
+def group_display_name(key, group):
+    """
+    Returns the display name of a group, showing an equivalent only if one exists for this exact name.
+    """
+    name = base_name(key)
+    equivalent = group_equivalent(key, group)
+    return f"{name} (equivalent: {equivalent})" if equivalent else name
+
+def iter_groups(index):
+    """
+    Yields (key, entries) pairs from a group index in sorted key order.
+    """
+    for key in sorted(index):
+        yield key, index[key]
+
+def iter_overlap_groups(index):
+    """
+    Yields (key, entries) pairs for the groups that contain two or more entries.
+    """
+    for key, group in iter_groups(index):
+        if len(group) > 1:
+            yield key, group
+
+# Entries held in memory while streaming before they are spilled to per-bucket files on disk
+stream_buffer_size = 100000
+# Number of surname buckets streamed entries are partitioned into each time they spill
+stream_buckets = 64
+# Number of times a bucket larger than the buffer is partitioned again before it is grouped as it is.
+# Every depth takes 6 more bits of the 32-bit surname hash.
+stream_max_depth = 4
+
+def _partition_key(entry, fuzzy):
+    """
+    Returns the surname key that every entry of a group shares: the surname for exact grouping, and
+    the surname prefix and phonetic code that build_fuzzy_index blocks on for fuzzy grouping.
+    """
+    last_name = entry['last_name'] or ''
+    return f"{last_name[:2].lower()}|{phonetic_key(last_name, length=None)}" if fuzzy else last_name
+
+def _iter_index_groups(entries, fuzzy, consider_dates):
+    index = build_fuzzy_index(entries) if fuzzy else build_group_index(entries)
+    return iter_overlap_groups(split_life_spans(index) if consider_dates else index)
+
+def _read_jsonl(path):
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            yield json.loads(line)
+
+def _spill_buckets(entries, fuzzy, prefix, depth, buffer_size):
+    """
+    Partitions entries by a hash of their surname key into stream_buckets JSONL files named prefix +
+    bucket number, holding at most buffer_size entries in memory. Each depth uses other bits of the hash.
+
+    Returns:
+        tuple: The (path, count) of each non-empty bucket, and whether all entries share one surname key.
+    """
+    buckets = [[] for _ in range(stream_buckets)]
+    counts = [0] * stream_buckets
+    first_key = None
+    single_key = True
+    held = 0
+
+    def spill():
+        for i, bucket in enumerate(buckets):
+            if bucket:
+                with open(f"{prefix}{i}.jsonl", 'a', encoding='utf-8') as f:
+                    f.writelines(json.dumps(entry, ensure_ascii=False) + '\n' for entry in bucket)
+                bucket.clear()
+
+    for entry in entries:
+        key = _partition_key(entry, fuzzy)
+        if first_key is None:
+            first_key = key
+        elif key != first_key:
+            single_key = False
+        # Each depth takes its bucket from the next bits of the hash
+        i = zlib.crc32(key.encode('utf-8')) // stream_buckets ** depth % stream_buckets
+        buckets[i].append(entry)
+        counts[i] += 1
+        held += 1
+        if held >= buffer_size:
+            spill()
+            held = 0
+    spill()
+    return [(f"{prefix}{i}.jsonl", count) for i, count in enumerate(counts) if count], single_key
+
+def _group_bucket(path, count, fuzzy, consider_dates, buffer_size, depth, group_paths):
+    """
+    Groups the entries of one bucket file, writing its sorted overlap groups next to it and adding that
+    file to group_paths. A bucket larger than buffer_size is partitioned again and its buckets grouped
+    on their own, unless all its entries share one surname key and so have to be grouped together.
+    """
+    if count > buffer_size and depth < stream_max_depth:
+        buckets, single_key = _spill_buckets(_read_jsonl(path), fuzzy, f"{path}.", depth + 1, buffer_size)
+        os.remove(path)
+        if not single_key:
+            for bucket_path, bucket_count in buckets:
+                _group_bucket(bucket_path, bucket_count, fuzzy, consider_dates, buffer_size, depth + 1, group_paths)
+            return
+        path, count = buckets[0]
+
+    groups_path = f"{path}.groups"
+    with open(groups_path, 'w', encoding='utf-8') as f:
+        for key, group in _iter_index_groups(list(_read_jsonl(path)), fuzzy, consider_dates):
+            f.write(json.dumps([key, group], ensure_ascii=False) + '\n')
+    os.remove(path)
+    group_paths.append(groups_path)
+
+def iter_streamed_overlaps(entries, fuzzy=False, consider_dates=True, buffer_size=None, spill_dir=None):
+    """
+    Groups a stream of entries in any order with bounded memory and yields the same overlap groups,
+    in the same order, as grouping them all at once.
+
+    Entries are buffered in memory up to buffer_size. Beyond that they are partitioned by a hash of
+    their surname key into stream_buckets buckets, which spill to JSONL files in a temporary
+    directory. Every group falls into a single bucket, so each bucket is then grouped on its own and
+    its sorted overlap groups written back to disk, and the buckets' groups are merged in key order.
+    Buckets that still hold more than buffer_size entries are partitioned again with another hash, so
+    the number of buckets grows with the input.
+
+    At most buffer_size entries are held while partitioning and grouping, except when more than
+    buffer_size entries share one surname key (one surname, or for fuzzy grouping one surname prefix
+    and phonetic code), since those are always grouped together. The merge then holds one overlap
+    group per bucket.
+
+    Args:
+        entries (iterable): Cleaned entries.
+        fuzzy (bool): Whether to group near-duplicate names with build_fuzzy_index.
+        consider_dates (bool): Whether to split groups whose life dates cannot belong to one person.
+        buffer_size (int): Entries held in memory before spilling. Defaults to stream_buffer_size.
+        spill_dir (str): Optional directory for the temporary bucket files.
+
+    Yields:
+        tuple: (key, entries) for each group with two or more entries, in sorted key order.
+    """
+    buffer_size = buffer_size or stream_buffer_size
+    buffered = []
+    entries = iter(entries)
+    for entry in entries:
+        if _is_eligible(entry):
+            buffered.append(entry)
+            if len(buffered) > buffer_size:
+                break
+    else:
+        yield from _iter_index_groups(buffered, fuzzy, consider_dates)
+        return
+
+    with tempfile.TemporaryDirectory(prefix='lux-stream-', dir=spill_dir) as temp_dir:
+        eligible = (entry for entry in itertools.chain(buffered, entries) if _is_eligible(entry))
+        buckets, _ = _spill_buckets(eligible, fuzzy, os.path.join(temp_dir, 'bucket-'), 0, buffer_size)
+        buffered = eligible = None
+
+        # Group each bucket on its own, keeping its sorted overlap groups on disk for the merge
+        group_paths = []
+        for path, count in buckets:
+            _group_bucket(path, count, fuzzy, consider_dates, buffer_size, 0, group_paths)
+
+        merged = heapq.merge(*(_read_jsonl(path) for path in group_paths), key=lambda item: item[0])
+        for key, group in merged:
+            yield tuple(key), group
+
+def overlap_record(key, group, confidence=None):
+    """
+    Returns the structured record of one overlap group, e.g.
+    {"name": "Fred H. Abbott", "equivalent": None, "confidence": 0.92,
+     "entries": [{"name": "Abbott, Fred H.", "uri": ..., "equivalent": ...}, ...]}
+
+    Args:
+        key (tuple): The group key.
+        group (list): The entries in the group.
+        confidence (float): Optional match confidence of the group.
+
+    Returns:
+        dict: The group name, its own equivalent if any, the confidence and the name, uri and
+        equivalent of each entry, with "candidate" set on the candidates of a fuzzy group.
+    """
+    entries = []
+    for entry in group:
+        record = {"name": entry['name'], "uri": entry.get('uri'), "equivalent": entry.get('equivalent')}
+        if entry.get('candidate'):
+            record["candidate"] = True
+        entries.append(record)
+    return {
+        "name": base_name(key),
+        "equivalent": group_equivalent(key, group),
+        "confidence": confidence,
+        "entries": entries,
+    }
+
+def iter_overlap_records(overlaps, min_confidence=None, confidences=None):
+    """
+    Scores overlap groups and yields their records one at a time.
+
+    Args:
+        overlaps (iterable): (key, entries) pairs, e.g. from iter_overlap_groups or iter_streamed_overlaps.
+        min_confidence (float): Optional threshold below which groups are left out.
+        confidences (dict): Optional precomputed scores from score_groups. Computed for groups it does not hold.
+
+    Yields:
+        dict: The record of each group, as returned by overlap_record.
+    """
+    from src.score import group_confidence
+
+    for key, group in overlaps:
+        confidence = confidences.get(key) if confidences is not None else None
+        if confidence is None:
+            confidence = group_confidence(group)
+        if min_confidence is None or confidence >= min_confidence:
+            yield overlap_record(key, group, confidence)
+
+def format_overlap_record(record):
+    """
+    Returns the lines of one overlap record in the overlap text format, e.g.
+    "── Fred Lyman Adair [confidence: 0.920]" followed by one "   └── " line per entry, ending in
+    " [candidate]" for the candidates of a fuzzy group.
+
+    Args:
+        record (dict): An overlap record from overlap_record.
+
+    Returns:
+        list: The group line followed by one line per entry.
+    """
+    parent_display = entry_display_name(record)
+    if record.get('confidence') is not None:
+        parent_display = f"{parent_display} [confidence: {record['confidence']:.3f}]"
+    lines = [f"── {parent_display}"]
+    for entry in record['entries']:
+        # Candidates of a fuzzy group are initials that fit several groups
+        lines.append(f"   └── {entry_display_name(entry)} [candidate]" if entry.get('candidate')
+                     else f"   └── {entry_display_name(entry)}")
+    return lines
+
+def format_overlap_group(key, group, confidence=None):
+    """
+    Returns the lines of one overlap group as written by format_overlap_record.
+    """
+    return format_overlap_record(overlap_record(key, group, confidence))
+
+def create_tree(entries, consider_dates=True):
+    """
+    Creates a tree structure from a list of entries. The tree is only needed for the full
+    rendering; overlaps can be found directly from build_group_index.
+
+    Args:
+        entries (list): A list of dictionaries containing the extracted data, or a group index.
+        consider_dates (bool): Whether to split name groups whose life dates cannot belong to one person
+            into one node per life span, with split_life_spans.
 
     Returns:
         Node: The root node of the tree.
     """
-    entries = [entry for entry in entries if entry['type'] == 'person' and entry["manual_review"] == False]
+    index = entries if isinstance(entries, dict) else build_group_index(entries)
+    if consider_dates:
+        index = split_life_spans(index)
     root = Node("Names")
-    
-    # Group entries by last name
-    last_name_groups = itertools.groupby(sorted(entries, key=lambda x: x['last_name'] or ''), key=lambda x: x['last_name'] or '')
-    
-    for last_name, group in last_name_groups:
-        # For last name node, don't show equivalent
-        last_name_node = Node(last_name, parent=root, display_name=last_name)
-        
-        group_list = list(group)
-        
-        name_groups = itertools.groupby(
-            sorted(group_list, key=lambda x: (x['last_name'] or '', x['first_name'] or '', x['middle_name'] or '', x.get('parentheticals', [''])[0] if x.get('parentheticals') else '')),
-            key=lambda x: (x['last_name'] or '', x['first_name'] or '', x['middle_name'] or '', x.get('parentheticals', [''])[0] if x.get('parentheticals') else '')
-        )
-        
-        for name, subgroup in name_groups:
-            subgroup_list = list(subgroup)
-            if name:
-                if name[3]:
-                    base_name = ' '.join(f"{name[1]} {name[2]} {name[0]} ({name[3]})".split())
-                else:
-                    base_name = ' '.join(f"{name[1]} {name[2]} {name[0]}".split())
-                
-                # Only add equivalent if it exists for this exact name
-                equivalent = next((entry['equivalent'] for entry in subgroup_list 
-                                if entry.get('equivalent') and entry['name'] == base_name), None)
-                display_name = f"{base_name} (equivalent: {equivalent})" if equivalent else base_name
-                name_node = Node(base_name, parent=last_name_node, display_name=display_name)
-                
-                # Add individual name variations, only showing equivalent if it exists
-                for entry in subgroup_list:
-                    entry_display = f"{entry['name']} (equivalent: {entry['equivalent']})" if entry.get('equivalent') else entry['name']
-                    Node(entry['name'], parent=name_node, display_name=entry_display)
+    last_name_node = None
+
+    for key, group in iter_groups(index):
+        last_name = key[0]
+        if last_name_node is None or last_name_node.name != last_name:
+            # For last name node, don't show equivalent
+            last_name_node = Node(last_name, parent=root, display_name=last_name)
+
+        name_node = Node(base_name(key), parent=last_name_node, display_name=group_display_name(key, group),
+                         equivalent=group_equivalent(key, group))
+
+        # Add individual name variations, only showing equivalent if it exists
+        for entry in group:
+            Node(entry['name'], parent=name_node, display_name=entry_display_name(entry),
+                 uri=entry.get('uri'), equivalent=entry.get('equivalent'))
 
     return root
 
-def write_tree(tree, output):
+def open_output(path, compress=None, encoding=None):
     """
-    Writes the tree structure to a file.
+    Opens an output file for writing text. The file is gzip-compressed when compress is set, or when
+    compress is None and its name ends in ".gz". Compressed files are always UTF-8.
     """
-    with open(output, 'w') as f:
-        f.write(tree)
-        
-def tree_to_string(tree):
+    if compress is None:
+        compress = path.endswith('.gz')
+    if compress:
+        return gzip.open(path, 'wt', encoding=encoding or 'utf-8')
+    return open(path, 'w', encoding=encoding)
+
+def _with_progress(items, progress, desc, unit):
+    if not progress:
+        return items
+    from tqdm import tqdm
+
+    return tqdm(items, desc=desc, unit=unit)
+
+def write_lines(lines, f, chunk_size=1000):
+    """
+    Writes lines to a file handle, separated by newlines, as they are produced. Lines are joined into
+    chunks of chunk_size, so there is one write call per chunk rather than per line, and only one chunk
+    is held in memory.
+
+    Args:
+        lines (iterable): The lines, without newlines.
+        f (file): A text file handle open for writing.
+        chunk_size (int): The number of lines per write.
+
+    Returns:
+        int: The number of lines written.
+    """
+    written = 0
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= chunk_size:
+            f.write(("\n" if written else "") + "\n".join(chunk))
+            written += len(chunk)
+            chunk = []
+    if chunk:
+        f.write(("\n" if written else "") + "\n".join(chunk))
+        written += len(chunk)
+    return written
+
+def iter_tree_lines(tree):
     """
-    Converts a tree to a string using display names for visualization.
+    Yields the lines of the tree rendering one at a time, using display names.
     """
-    output_branches = []
     for pre, _, node in RenderTree(tree):
         # Use display_name if it exists, otherwise use name
         display_text = getattr(node, 'display_name', node.name)
-        output_branches.append(f"{pre}{display_text}")
+        yield f"{pre}{display_text}"
 
-    output_str = "\n".join(output_branches)
-    return output_str
+def render_tree(tree, f, chunk_size=1000, progress=False):
+    """
+    Writes the tree rendering to a file handle in chunks of lines while the tree is walked, so the
+    rendering is never held in memory as a whole.
 
-def find_overlaps(tree):
+    Args:
+        tree (Node): The root node from create_tree.
+        f (file): A text file handle open for writing, e.g. from open_output.
+        chunk_size (int): The number of lines per write.
+        progress (bool): Whether to show a progress bar of the lines written.
+
+    Returns:
+        int: The number of lines written.
     """
-    Finds overlaps in the tree structure.
+    return write_lines(_with_progress(iter_tree_lines(tree), progress, "Writing tree", " lines"), f, chunk_size)
+
+def render_overlaps(records, f, chunk_size=1000, progress=False):
+    """
+    Writes overlap records to a file handle in the overlap text format as they arrive, in chunks of
+    lines.
 
     Args:
-        tree (Node): The root node of the tree.
+        records (iterable): Overlap records, e.g. from find_overlaps.
+        f (file): A text file handle open for writing, e.g. from open_output.
+        chunk_size (int): The number of lines per write.
+        progress (bool): Whether to show a progress bar of the groups written.
 
     Returns:
-        str: A string representation of the overlaps.
+        int: The number of records written.
     """
-    overlap_branches = []
+    written = 0
 
-    # Iterate through the tree to find instances where the final child has 2 or more nodes
-    for pre, _, node in RenderTree(tree):
-        if node.is_leaf and node.parent and len(node.parent.children) > 1:
-            if node == node.parent.children[-1]:  # Check if it's the last child
-                parent = node.parent
-                # Use display_name for parent
-                parent_display = getattr(parent, 'display_name', parent.name)
-                overlap_branches.append(f"── {parent_display}")
-                for child in parent.children:
-                    # Use display_name for children
-                    child_display = getattr(child, 'display_name', child.name)
-                    overlap_branches.append(f"   └── {child_display}")
-
-    overlap_str = "\n".join(overlap_branches)
-
-    return overlap_str
\ No newline at end of file
+    def lines():
+        nonlocal written
+        for record in _with_progress(records, progress, "Writing overlap groups", " groups"):
+            written += 1
+            yield from format_overlap_record(record)
+
+    write_lines(lines(), f, chunk_size)
+    return written
+
+def write_tree(tree, output, compress=None, progress=False):
+    """
+    Writes the tree structure to a file. A root node is rendered line by line while it is walked; a
+    string from tree_to_string is written as it is.
+
+    Args:
+        tree (Node | str): The root node from create_tree, or its rendering.
+        output (str): The output file name.
+        compress (bool): Whether to gzip the file. Defaults to whether the name ends in ".gz".
+        progress (bool): Whether to show a progress bar while rendering.
+
+    Returns:
+        int: The number of lines written.
+    """
+    with open_output(output, compress) as f:
+        if isinstance(tree, Node):
+            return render_tree(tree, f, progress=progress)
+        f.write(tree)
+        return tree.count("\n") + 1 if tree else 0
+
+def tree_to_string(tree):
+    """
+    Converts a tree to a string using display names for visualization. Use render_tree to write a
+    large tree without building the string.
+    """
+    return "\n".join(iter_tree_lines(tree))
+
+def _iter_tree_overlaps(tree):
+    for last_name_node in tree.children:
+        for name_node in last_name_node.children:
+            if len(name_node.children) > 1:
+                yield {
+                    "name": name_node.name,
+                    "equivalent": getattr(name_node, 'equivalent', None),
+                    "confidence": None,
+                    "entries": [{"name": child.name, "uri": getattr(child, 'uri', None),
+                                 "equivalent": getattr(child, 'equivalent', None)}
+                                for child in name_node.children],
+                }
+
+def find_overlaps(groups, min_confidence=None, confidences=None, consider_dates=True):
+    """
+    Finds overlaps, i.e. name groups with two or more entries, as structured records. Groups from an
+    index carry a match confidence score. Records are yielded one at a time, so the text, CSV and JSONL
+    writers can stream them without building the whole output in memory.
+
+    Args:
+        groups (dict | Node): A group index from build_group_index, or the root node from create_tree.
+        min_confidence (float): Optional threshold below which groups are left out.
+        confidences (dict): Optional precomputed scores from score_groups. Computed when not given.
+        consider_dates (bool): Whether to split index groups whose life dates cannot belong to one person,
+            with split_life_spans. A tree is already split by create_tree.
+
+    Returns:
+        iterator: One record per overlap group, as returned by overlap_record. Records from a tree
+        have no confidence.
+    """
+    if isinstance(groups, Node):
+        return _iter_tree_overlaps(groups)
+    if consider_dates:
+        groups = split_life_spans(groups)
+    return iter_overlap_records(iter_overlap_groups(groups), min_confidence=min_confidence, confidences=confidences)
@@ -0,0 +1,56 @@
+import os
+import sys
+import copy
+import threading
+import pytest
+
+# The modules are imported from the repository root, as the scripts do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def synthetic_entries():
+    """
+    Returns a function giving the entries of generate_entries(count, seed), cleaned unless clean=False.
+    Each corpus is generated once per session and every call returns a deep copy, so tests may change it.
+    """
+    from src.synthetic import generate_entries
+    from src.clean import normalize_entries
+
+    corpora = {}
+
+    def make(count, seed=0, clean=True):
+        key = (count, seed, clean)
+        if key not in corpora:
+            entries = generate_entries(count, seed)
+            corpora[key] = normalize_entries(entries) if clean else entries
+        return copy.deepcopy(corpora[key])
+
+    return make
+
+
+@pytest.fixture
+def lux_stub(request):
+    """
+    Starts a stub LuxY server on a free port and points LuxY at it. Options of make_stub_server are
+    passed with @pytest.mark.lux_stub(...). Yields the server, whose StubLux is server.lux.
+    """
+    from luxy import api
+    from lux_stub import make_stub_server
+    from src.download import set_lux_url
+
+    marker = request.node.get_closest_marker('lux_stub')
+    server = make_stub_server(**{'count': 200, **(marker.kwargs if marker else {})})
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    saved = {name: api.config[name] for name in ('lux_url', 'lux_config')}
+    set_lux_url(f"http://127.0.0.1:{server.server_address[1]}")
+    yield server
+    server.shutdown()
+    server.server_close()
+    api.config.update(saved)
+    api.clear_lux_config_cache()
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'lux_stub(**options): options of the stub LuxY server')
@@ -0,0 +1,57 @@
+import os
+import sys
+import subprocess
+import pytest
+from src.cache import ResponseCache
+from src.download import extract_luxy_entries
+from separate import process_queries, process_query, read_queries
+
+filters = {"recordType": "person"}
+queries = ["fred", "frederick", "adams"]
+
+
+def search(query):
+    from luxy import PeopleGroups
+
+    return PeopleGroups().filter(name=query, **filters).get()
+
+
+@pytest.mark.lux_stub(count=2000, jitter=0.002)
+def test_batch_caches_raw_entries(lux_stub, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    counts = process_queries(queries, output_dir=str(tmp_path / "out"), max_queries=3, workers=4,
+                             cache_dir=cache_dir)
+    assert all(counts[query] for query in queries)
+
+    cache = ResponseCache(cache_dir)
+    for query in queries:
+        # Records shared with another query are cached as downloaded, not as cleaned
+        assert cache.get(query, filters) == list(extract_luxy_entries(search(query), max_workers=4))
+
+
+@pytest.mark.lux_stub(count=2000)
+def test_batch_outputs_match_single_queries(lux_stub, tmp_path):
+    process_queries(queries, output_dir=str(tmp_path / "batch"), cache_dir=str(tmp_path / "batch_cache"))
+    for query in queries:
+        process_query(query, str(tmp_path / f"{query}.txt"), cache_dir=str(tmp_path / "single_cache"))
+        for suffix in ("_overlap.txt", "_mapping.csv"):
+            single = (tmp_path / f"{query}{suffix}").read_text()
+            assert (tmp_path / "batch" / f"{query}{suffix}").read_text() == single
+
+
+def test_batch_rejects_streaming(tmp_path):
+    (tmp_path / "queries.txt").write_text("fred\n")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, os.path.join(root, "separate.py"), "--batch", str(tmp_path / "queries.txt"),
+                             "--stream"], cwd=str(tmp_path), capture_output=True, text=True)
+    assert result.returncode == 2
+    assert "--stream cannot be combined with --batch" in result.stderr
+
+
+@pytest.mark.lux_stub(count=500)
+def test_batch_runs_repeated_queries_once(lux_stub, tmp_path):
+    counts = process_queries(["Fred", "fred", "FRED "], output_dir=str(tmp_path / "out"),
+                             cache_dir=str(tmp_path / "cache"))
+    assert list(counts) == ["Fred"] and counts["Fred"]
+    (tmp_path / "queries.txt").write_text("Fred\n# a comment\nfred\n\nFRED \nadams\n")
+    assert read_queries(str(tmp_path / "queries.txt")) == ["Fred", "adams"]
@@ -0,0 +1,68 @@
+import os
+import pytest
+from src.cache import ResponseCache
+from separate import load_entries
+
+filters = {"recordType": "person"}
+
+
+def entries(count, prefix="fred"):
+    return [{'uri': f"{prefix}/{i}", 'name': f"Adams, Fred {i}", 'type': 'person'} for i in range(count)]
+
+
+def test_queries_share_entries_by_normalized_query(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.put("Fred Adams ", filters, entries(3))
+    assert cache.get("fred  adams", filters) == entries(3)
+    assert cache.get("fred adams", {"recordType": "group"}) is None
+
+
+def test_expired_results_are_only_used_when_stale_is_allowed(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl=-1)
+    cache.put("fred", filters, entries(2))
+    assert cache.get("fred", filters) is None
+    assert cache.get("fred", filters, allow_stale=True) == entries(2)
+
+
+def test_offline_runs_use_expired_results(tmp_path):
+    ResponseCache(str(tmp_path)).put("fred", filters, entries(2))
+    assert load_entries("fred", offline=True, cache_dir=str(tmp_path), cache_ttl=-1) == entries(2)
+    with pytest.raises(LookupError):
+        load_entries("adams", offline=True, cache_dir=str(tmp_path))
+
+
+def test_least_recently_used_results_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    for i, query in enumerate(("first", "second", "third")):
+        cache.put(query, filters, entries(5, query))
+        os.utime(cache.path(query, filters), (1000 + i, 1000 + i))
+    # Reading the oldest result makes it the most recently used
+    assert cache.get("first", filters)
+    size = os.path.getsize(cache.path("first", filters))
+    cache.max_bytes = 2 * size + 10
+    assert cache.evict() == 1
+    assert cache.get("second", filters) is None
+    assert cache.get("first", filters) and cache.get("third", filters)
+
+
+def test_interrupted_record_keeps_the_previous_result(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.put("fred", filters, entries(2))
+    recording = cache.record("fred", filters, entries(10, "new"))
+    assert [next(recording) for _ in range(3)] == entries(3, "new")
+    recording.close()
+    assert cache.get("fred", filters) == entries(2)
+    assert os.listdir(str(tmp_path)) == [os.path.basename(cache.path("fred", filters))]
+
+
+def test_concurrent_writers_of_one_key(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    first = cache.record("fred", filters, entries(3, "first"))
+    second = cache.record("fred", filters, entries(3, "second"))
+    # Both writers hold their temporary file open at the same time
+    next(first)
+    next(second)
+    assert list(first) == entries(3, "first")[1:]
+    assert list(second) == entries(3, "second")[1:]
+    assert cache.get("fred", filters) == entries(3, "second")
+    assert os.listdir(str(tmp_path)) == [os.path.basename(cache.path("fred", filters))]
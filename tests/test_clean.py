@@ -0,0 +1,66 @@
+import copy
+import pytest
+from src import clean
+from src.clean import NameCache, normalize_entries, iter_normalized
+
+edge_names = [
+    "J.R.R. Tolkien",
+    "Tolkien, J.R.R. (John Ronald Reuel), 1892-1973",
+    "A.B.Carter, 1900-1950",
+    "[Smith], John",
+    "Adams, Fred, 1921-",
+    "Smith, John, b. 1850",
+    "Jones, Mary, d. 1900",
+    "Unbalanced (paren",
+    ", 1931-",
+    "",
+]
+
+step_chain = [clean.standardize_abbreviations, clean.remove_dates, clean.check_parentheses,
+              clean.extract_parentheticals, clean.remove_parentheticals, clean.move_lastname,
+              clean.extract_name_parts]
+
+
+@pytest.fixture(scope='module')
+def entries(synthetic_entries):
+    entries = synthetic_entries(2000, seed=3, clean=False)
+    entries += [{'name': name, 'type': 'person', 'uri': f'edge/{i}'} for i, name in enumerate(edge_names)]
+    entries += [{'name': 'Yale University, 1701-', 'type': 'group'}, {'name': None, 'type': 'person'}]
+    return entries
+
+
+def test_fused_normalizer_equals_step_chain(entries):
+    chained = copy.deepcopy(entries)
+    for step in step_chain:
+        chained = step(chained)
+    assert normalize_entries(copy.deepcopy(entries)) == chained
+    assert list(iter_normalized(copy.deepcopy(entries))) == chained
+
+
+def test_name_cache_gives_the_same_parts(entries):
+    cold = normalize_entries(copy.deepcopy(entries), cache=NameCache(maxsize=10))
+    warm_cache = NameCache()
+    normalize_entries(copy.deepcopy(entries), cache=warm_cache)
+    assert normalize_entries(copy.deepcopy(entries), cache=warm_cache) == cold
+    assert warm_cache.hits >= len(entries) - 2
+
+
+def test_name_cache_is_bounded():
+    cache = NameCache(maxsize=3)
+    for name in ["Fred Adams", "John Smith", "Mary Jones", "Fred Adams", "Ann Lee"]:
+        cache.parse(name)
+    assert len(cache) == 3
+    assert cache.stats()['evictions'] == 1
+    # "John Smith" was the least recently used
+    assert cache.parse("John Smith") and cache.stats()['misses'] == 5
+
+
+def test_name_cache_round_trips(tmp_path):
+    path = str(tmp_path / "names.json")
+    cache = NameCache(path=path)
+    parts = cache.parse("Frederick Lyman Adair")
+    cache.save()
+    loaded = NameCache(path=path)
+    assert len(loaded) == 1
+    assert loaded.parse("Frederick Lyman Adair") == parts
+    assert loaded.stats()['hits'] == 1
@@ -0,0 +1,33 @@
+import pytest
+import corpus
+from src import download
+
+rows = [
+    ("Adair, Fred Lyman, 1877-1972", "ils_record_cache", "r1", "https://lux.example/data/person/1"),
+    ("Fred Lyman Adair", "ycba_record_cache", "r2", "https://lux.example/data/person/2"),
+    # One record with two primary names that group together
+    ("Adams, Fred", "ils_record_cache", "r3", "https://lux.example/data/person/3"),
+    ("Fred Adams", "ils_record_cache", "r3", "https://lux.example/data/person/3"),
+    ("Tolkien, J. R. R.", "yuag_record_cache", "r4", "https://lux.example/data/person/4"),
+]
+
+
+@pytest.fixture
+def shard(monkeypatch):
+    monkeypatch.setattr(download, 'fetch_shard', lambda shard, shard_count: iter(rows))
+    monkeypatch.setattr(download, 'close_pool', lambda: None)
+
+
+def test_record_does_not_overlap_with_itself(shard):
+    records, count = corpus.process_shard(0, 1, full_shard=True)
+    assert count == len(rows)
+    assert [record['name'] for record in records] == ["Fred Lyman Adair"]
+    assert {entry['uri'] for entry in records[0]['entries']} == {rows[0][3], rows[1][3]}
+
+
+def test_dedupe_keeps_the_first_entry_of_each_record():
+    first = {"source_cache": "ils_record_cache", "record_id": "r3", "name": "Adams, Fred"}
+    second = dict(first, name="Fred Adams")
+    other = {"source_cache": "ycba_record_cache", "record_id": "r3", "name": "Adams, Fred"}
+    groups = corpus.dedupe_records({("Adams", "Fred", "", ""): [first, second, other]})
+    assert groups == {("Adams", "Fred", "", ""): [first, other]}
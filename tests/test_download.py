@@ -0,0 +1,158 @@
+import os
+import sys
+import random
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import requests
+from src.download import with_retry, ordered_map, extract_luxy_entries
+
+
+def flaky(errors):
+    """
+    Returns a function that raises the given errors in turn before answering, and the list of its calls.
+    """
+    calls = []
+
+    def func(arg):
+        calls.append(arg)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return arg * 2
+
+    return func, calls
+
+
+def server_error(status=503):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f"{status} Server Error", response=response)
+
+
+def test_ordered_map_keeps_input_order_under_shuffled_latency():
+    rng = random.Random(0)
+    delays = [rng.uniform(0, 0.01) for _ in range(200)]
+    in_flight = peak = 0
+    lock = threading.Lock()
+
+    def work(i):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(delays[i])
+        with lock:
+            in_flight -= 1
+        return i
+
+    with ThreadPoolExecutor(8) as executor:
+        assert list(ordered_map(executor, work, range(200), max_pending=16)) == list(range(200))
+    assert peak <= 16
+
+
+def test_ordered_map_pulls_input_lazily():
+    pulled = []
+
+    def items():
+        for i in range(100):
+            pulled.append(i)
+            yield i
+
+    with ThreadPoolExecutor(2) as executor:
+        results = ordered_map(executor, lambda i: i, items(), max_pending=4)
+        assert next(results) == 0
+        assert len(pulled) <= 5
+
+
+def test_with_retry_retries_server_errors():
+    func, calls = flaky([server_error(503), server_error(502)])
+    assert with_retry(func, 21, retries=3, backoff=0) == 42
+    assert calls == [21, 21, 21]
+
+
+def test_with_retry_retries_timeouts():
+    func, calls = flaky([requests.Timeout("read timed out"), requests.ConnectionError("reset")])
+    assert with_retry(func, 1, retries=2, backoff=0) == 2
+    assert len(calls) == 3
+
+
+def test_with_retry_respects_the_limit():
+    func, calls = flaky([server_error()] * 10)
+    with pytest.raises(requests.HTTPError):
+        with_retry(func, 1, retries=3, backoff=0)
+    assert len(calls) == 4
+
+    func, calls = flaky([requests.Timeout()] * 10)
+    with pytest.raises(requests.Timeout):
+        with_retry(func, 1, retries=0, backoff=0)
+    assert len(calls) == 1
+
+
+def test_with_retry_does_not_retry_other_errors():
+    func, calls = flaky([KeyError('id')])
+    with pytest.raises(KeyError):
+        with_retry(func, 1, retries=3, backoff=0)
+    assert len(calls) == 1
+
+
+def expected_entries(lux, query):
+    return [entry['name'] for entry in lux.records if query in entry['name'].lower()]
+
+
+def search(query):
+    from luxy import PeopleGroups
+
+    return PeopleGroups().filter(name=query, recordType="person").get()
+
+
+@pytest.mark.lux_stub(jitter=0.01)
+def test_extract_luxy_entries_keeps_search_order(lux_stub):
+    entries = list(extract_luxy_entries(search('a'), max_workers=8))
+    assert [entry['name'] for entry in entries] == expected_entries(lux_stub.lux, 'a')
+    assert len(entries) > 50
+    assert all(entry['type'] == 'person' and entry['uri'] for entry in entries)
+
+
+@pytest.mark.lux_stub(failures=1, jitter=0.005)
+def test_extract_luxy_entries_retries_server_errors(lux_stub):
+    entries = list(extract_luxy_entries(search('a'), max_workers=8, retries=2, backoff=0))
+    assert [entry['name'] for entry in entries] == expected_entries(lux_stub.lux, 'a')
+    assert set(lux_stub.lux.attempts.values()) == {2}
+
+
+@pytest.mark.lux_stub(stall=1.0)
+def test_extract_luxy_entries_retries_timeouts(lux_stub):
+    entries = list(extract_luxy_entries(search('ab'), max_workers=8, retries=2, backoff=0, timeout=0.2))
+    assert [entry['name'] for entry in entries] == expected_entries(lux_stub.lux, 'ab')
+    assert entries and all(attempts >= 2 for attempts in lux_stub.lux.attempts.values())
+
+
+@pytest.mark.lux_stub(failures=5)
+def test_extract_luxy_entries_gives_up_after_the_retry_limit(lux_stub):
+    with pytest.raises(requests.HTTPError):
+        list(extract_luxy_entries(search('ab'), max_workers=2, retries=1, backoff=0))
+    assert lux_stub.lux.attempts and max(lux_stub.lux.attempts.values()) == 2
+
+
+lazy_check = """
+import sys
+import src.download, separate
+heavy = ['psycopg2', 'dotenv', 'pipeline', 'luxy', 'nameparser']
+print([name for name in heavy if any(module == name or module.startswith(name + '.') for module in sys.modules)])
+src.download.set_db_config({'dsn': 'postgresql://example'})
+print(src.download.db_config)
+try:
+    src.download.missing
+except AttributeError:
+    print('AttributeError')
+"""
+
+
+def test_imports_load_no_heavy_dependencies():
+    # A fresh interpreter, since the other tests import these modules
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", lazy_check], cwd=root, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.splitlines() == ["[]", "{'dsn': 'postgresql://example'}", "AttributeError"]
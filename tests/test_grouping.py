@@ -0,0 +1,76 @@
+import pytest
+from src.clean import normalize_entries
+from src.visualize import build_group_index, build_fuzzy_index, group_key, create_tree, find_overlaps
+
+
+@pytest.fixture(scope='module')
+def entries(synthetic_entries):
+    entries = synthetic_entries(3000, seed=5)
+    entries.append({'name': 'Yale University', 'type': 'group'})
+    return entries
+
+
+def names(group):
+    return [entry['name'] for entry in group]
+
+
+def test_group_index_matches_pairwise_grouping(entries):
+    eligible = [entry for entry in entries if entry['type'] == 'person' and not entry['manual_review']]
+    index = build_group_index(entries)
+    assert sum(len(group) for group in index.values()) == len(eligible)
+    for key, group in index.items():
+        # Every entry with the key, in input order
+        assert group == [entry for entry in eligible if group_key(entry) == key]
+
+
+def test_tree_and_index_find_the_same_overlaps(entries):
+    index = build_group_index(entries)
+    from_index = [{**record, 'confidence': None} for record in find_overlaps(index)]
+    assert from_index == list(find_overlaps(create_tree(index)))
+    assert len(from_index) > 100
+
+
+def person(name):
+    return normalize_entries([{'name': name, 'type': 'person'}])[0]
+
+
+def test_fuzzy_index_links_initials_and_full_names():
+    entries = [person(name) for name in ("Adair, F. L.", "Adair, Fred Lyman", "Frederick L. Adair",
+                                         "Adair, Fred Lyman, 1877-1972", "Adair, Mary", "Adams, Fred L.")]
+    groups = sorted(names(group) for group in build_fuzzy_index(entries).values())
+    assert groups == [["Adair, F. L.", "Adair, Fred Lyman", "Adair, Fred Lyman, 1877-1972", "Frederick L. Adair"],
+                      ["Adair, Mary"], ["Adams, Fred L."]]
+
+
+def test_initials_do_not_link_different_first_names():
+    entries = [person(name) for name in ("Smith, H.", "Smith, Helen", "Smith, Hugh", "Smith, H.", "Smith, Hugo")]
+    index = build_fuzzy_index(entries)
+    assert sorted(names(group) for group in index.values()) == [
+        ["Smith, Helen", "Smith, H.", "Smith, H."], ["Smith, Hugh", "Smith, Hugo", "Smith, H.", "Smith, H."]]
+    for group in index.values():
+        assert [entry.get('candidate', False) for entry in group][-2:] == [True, True]
+    records = list(find_overlaps(index))
+    assert all(entry.get('candidate') for record in records for entry in record['entries']
+               if entry['name'] == "Smith, H.")
+
+
+def test_fuzzy_groups_do_not_mix_first_names(entries):
+    for group in build_fuzzy_index(entries).values():
+        blocks = {(entry['first_name'][:3].lower(), (entry['middle_name'] or ' ')[:1].lower()) for entry in group
+                  if not entry.get('candidate') and len(entry['first_name'].strip('.')) > 1}
+        assert len(blocks) <= 1
+
+
+def test_fuzzy_groups_are_unions_of_exact_groups(entries):
+    fuzzy = build_fuzzy_index(entries)
+    fuzzy_group_of = {id(entry): key for key, group in fuzzy.items() for entry in group if not entry.get('candidate')}
+    candidates = {entry['uri'] for group in fuzzy.values() for entry in group if entry.get('candidate')}
+    assert candidates
+    exact = build_group_index(entries)
+    for group in exact.values():
+        if group[0]['uri'] in candidates:
+            # Initials fitting several groups are only candidates of each
+            assert all(entry['uri'] in candidates and id(entry) not in fuzzy_group_of for entry in group)
+        else:
+            assert len({fuzzy_group_of[id(entry)] for entry in group}) == 1
+    assert len(fuzzy_group_of) + len(candidates) == sum(len(group) for group in exact.values())
@@ -0,0 +1,57 @@
+import copy
+import random
+import pytest
+from src.clean import normalize_entries
+from separate import write_outputs, update_outputs
+
+suffixes = ("_overlap.txt", "_mapping.csv", "_overlap.jsonl")
+
+
+def full_run(entries, output):
+    write_outputs(normalize_entries(copy.deepcopy(entries)), output, jsonl=True)
+
+
+def outputs(output):
+    base = output.replace(".txt", "")
+    return {suffix: open(f"{base}{suffix}", encoding='utf-8').read() for suffix in suffixes}
+
+
+def edit(entries, rng, synthetic_entries):
+    """
+    Removes, renames and adds records, and adds one with the same content as an existing record.
+    """
+    entries = copy.deepcopy(entries)
+    for i in sorted(rng.sample(range(len(entries)), 40), reverse=True):
+        del entries[i]
+    for entry in rng.sample(entries, 40):
+        entry['name'] = rng.choice(entries)['name']
+    for entry in rng.sample(entries, 20):
+        entry['equivalent'] = f"http://viaf.org/viaf/{rng.randrange(10 ** 6)}"
+    added = synthetic_entries(60, seed=rng.randrange(1000), clean=False)
+    for i, entry in enumerate(added):
+        entry['uri'] += f"-new-{i}"
+    entries += added + [{k: v for k, v in entries[0].items() if k != 'uri'}] * 2
+    return entries
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_incremental_runs_match_full_runs(tmp_path, synthetic_entries, seed):
+    rng = random.Random(seed)
+    entries = synthetic_entries(1500, seed=seed, clean=False)
+    incremental, full = str(tmp_path / "incremental.txt"), str(tmp_path / "full.txt")
+
+    # The first run has no state and processes everything
+    update_outputs(copy.deepcopy(entries), incremental, jsonl=True)
+    full_run(entries, full)
+    assert outputs(incremental) == outputs(full)
+
+    for _ in range(3):
+        entries = edit(entries, rng, synthetic_entries)
+        changes = update_outputs(copy.deepcopy(entries), incremental, jsonl=True)
+        full_run(entries, full)
+        assert outputs(incremental) == outputs(full)
+    assert any(changes.values())
+
+    # An unchanged rerun changes nothing
+    assert not any(update_outputs(copy.deepcopy(entries), incremental, jsonl=True).values())
+    assert outputs(incremental) == outputs(full)
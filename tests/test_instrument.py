@@ -0,0 +1,37 @@
+import json
+import tracemalloc
+from src.instrument import Profiler
+
+
+def test_memory_is_not_traced_by_default():
+    profiler = Profiler()
+    with profiler.stage('clean', count_in=3) as stage:
+        assert not tracemalloc.is_tracing()
+        stage['count_out'] = 3
+    record, = profiler.stages
+    assert 'peak_memory_delta' not in record
+    assert record['seconds'] >= 0 and record['count_out'] == 3
+
+
+def test_memory_tracing_is_opt_in():
+    profiler = Profiler(trace_memory=True)
+    with profiler.stage('outer'):
+        with profiler.stage('inner'):
+            assert tracemalloc.is_tracing()
+            data = [bytes(1024) for _ in range(1000)]
+        del data
+    assert not tracemalloc.is_tracing()
+    inner, outer = profiler.stages
+    assert inner['peak_memory_delta'] >= 1000 * 1024
+    assert outer['peak_memory_delta'] >= inner['peak_memory_delta']
+
+
+def test_trace_events(tmp_path):
+    profiler = Profiler()
+    with profiler.stage('group', count_in=5) as stage:
+        stage['count_out'] = 2
+    path = tmp_path / "trace.json"
+    profiler.write_trace(str(path))
+    event, = json.loads(path.read_text())['traceEvents']
+    assert event['name'] == 'group' and event['ph'] == 'X'
+    assert event['args']['count_in'] == 5 and event['args']['count_out'] == 2
@@ -0,0 +1,81 @@
+from src.clean import normalize_entries
+from src.visualize import life_span_clusters, split_life_spans, build_group_index, base_name, group_equivalent
+
+
+def clusters(*names):
+    entries = normalize_entries([{'name': name, 'type': 'person'} for name in names])
+    return [(span, [entry['name'] for entry in group]) for span, group in life_span_clusters(entries)]
+
+
+def test_open_ended_ranges_decades_apart_are_split():
+    assert clusters("Adams, Fred, 1921-", "Adams, Fred, 1961-") == [
+        ("1921-", ["Adams, Fred, 1921-"]), ("1961-", ["Adams, Fred, 1961-"])]
+
+
+def test_group_split_keys_are_named_after_life_spans():
+    entries = normalize_entries([{'name': name, 'type': 'person'}
+                                 for name in ("Adams, Fred, 1921-", "Adams, Fred, 1961-", "Adams, Fred, 1921-")])
+    split = split_life_spans(build_group_index(entries))
+    assert sorted(base_name(key) for key in split) == ["Fred Adams, 1921-", "Fred Adams, 1961-"]
+    assert [len(group) for key, group in sorted(split.items())] == [2, 1]
+
+
+def test_compatible_neighbours_stay_together():
+    assert clusters("Adams, Fred, 1901-", "Adams, Fred, 1902-") == [
+        ("1901-", ["Adams, Fred, 1901-", "Adams, Fred, 1902-"])]
+    # Another record within the tolerance does not pull them apart
+    assert clusters("Adams, Fred, 1901-", "Adams, Fred, 1902-", "Adams, Fred, 1900-") == [
+        ("1900-", ["Adams, Fred, 1901-", "Adams, Fred, 1902-", "Adams, Fred, 1900-"])]
+    assert clusters("Adams, Fred, 1901-1951", "Adams, Fred, 1900-1950", "Adams, Fred, 1902-1951") == [
+        ("1900-1950", ["Adams, Fred, 1901-1951", "Adams, Fred, 1900-1950", "Adams, Fred, 1902-1951"])]
+
+
+def test_consecutive_years_do_not_chain_without_bound():
+    assert clusters("Adams, Fred, 1900-", "Adams, Fred, 1901-", "Adams, Fred, 1902-", "Adams, Fred, 1903-",
+                    "Adams, Fred, 1904-", "Adams, Fred, 1905-") == [
+        ("1900-", ["Adams, Fred, 1900-", "Adams, Fred, 1901-", "Adams, Fred, 1902-"]),
+        ("1903-", ["Adams, Fred, 1903-", "Adams, Fred, 1904-", "Adams, Fred, 1905-"])]
+    assert [span for span, _ in clusters("Adams, Fred, 1900-1950", "Adams, Fred, 1901-1951",
+                                         "Adams, Fred, 1902-1952", "Adams, Fred, 1903-1953")] == \
+        ["1900-1950", "1903-1953"]
+    # Years further apart than the tolerance are never joined
+    assert [span for span, _ in clusters("Adams, Fred, 1900-", "Adams, Fred, 1902-")] == ["1900-", "1902-"]
+
+
+def test_open_ended_range_joins_the_one_compatible_cluster():
+    assert clusters("Adams, Fred, 1921-1990", "Adams, Fred, 1961-2001", "Adams, Fred, 1921-") == [
+        ("1921-1990", ["Adams, Fred, 1921-1990", "Adams, Fred, 1921-"]),
+        ("1961-2001", ["Adams, Fred, 1961-2001"])]
+    assert clusters("Adams, Fred, 1921-1990", "Adams, Fred, 1961-2001", "Adams, Fred, 1922-") == [
+        ("1921-1990", ["Adams, Fred, 1921-1990", "Adams, Fred, 1922-"]),
+        ("1961-2001", ["Adams, Fred, 1961-2001"])]
+
+
+def test_open_ended_range_stays_apart_when_ambiguous():
+    assert clusters("Adams, Fred, 1921-1950", "Adams, Fred, 1921-1990", "Adams, Fred, 1921-") == [
+        ("1921-1950", ["Adams, Fred, 1921-1950"]),
+        ("1921-1990", ["Adams, Fred, 1921-1990"]),
+        ("1921-", ["Adams, Fred, 1921-"])]
+
+
+def test_death_years_join_the_matching_closed_range():
+    assert clusters("Jones, Mary, d. 1900", "Jones, Mary, 1850-1900", "Jones, Mary, 1870-1930",
+                    "Jones, Mary, d. 1960") == [
+        ("1850-1900", ["Jones, Mary, d. 1900", "Jones, Mary, 1850-1900"]),
+        ("1870-1930", ["Jones, Mary, 1870-1930"]),
+        ("d. 1960", ["Jones, Mary, d. 1960"])]
+
+
+def test_undated_entries_join_only_a_single_cluster():
+    assert clusters("Adams, Fred", "Adams, Fred, 1921-1990", "Adams, Fred, 1921-") == [
+        ("1921-1990", ["Adams, Fred", "Adams, Fred, 1921-1990", "Adams, Fred, 1921-"])]
+    assert clusters("Adams, Fred", "Adams, Fred, 1921-", "Adams, Fred, 1961-") == [
+        ("1921-", ["Adams, Fred, 1921-"]), ("1961-", ["Adams, Fred, 1961-"]), ("", ["Adams, Fred"])]
+
+
+def test_split_groups_keep_their_own_equivalent():
+    key = ("Adams", "Fred", "", "", "1921-")
+    group = [{'name': "Adams, Fred, 1921-", 'equivalent': "http://viaf.org/viaf/1"},
+             {'name': "Fred Adams", 'equivalent': "http://viaf.org/viaf/2"}]
+    assert base_name(key) == "Fred Adams, 1921-"
+    assert group_equivalent(key, group) == "http://viaf.org/viaf/2"
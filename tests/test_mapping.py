@@ -0,0 +1,63 @@
+import random
+from separate import UriClusters, get_priority_index, record_uris
+
+loc = "http://id.loc.gov/authorities/names/"
+viaf = "http://viaf.org/viaf/"
+yale = "https://linked-art.library.yale.edu/node/"
+
+
+def mapping(clusters):
+    return {related: primary for primary, related, _, _ in clusters.rows()}
+
+
+def test_groups_sharing_a_uri_are_merged():
+    clusters = UriClusters()
+    clusters.add_group("Fred Adair", [viaf + "1", loc + "1"], 0.9)
+    clusters.add_group("F. L. Adair", [loc + "1", yale + "1"], 0.8)
+    clusters.add_group("Mary Jones", [viaf + "2", loc + "2"], 0.7)
+    assert mapping(clusters) == {viaf + "1": yale + "1", loc + "1": yale + "1", viaf + "2": loc + "2"}
+    # Each related URI keeps the group it was first seen in
+    assert [row[2:] for row in clusters.rows()] == [["Fred Adair", 0.9], ["Fred Adair", 0.9], ["Mary Jones", 0.7]]
+
+
+def test_clusters_are_transitive_and_order_independent():
+    rng = random.Random(0)
+    groups = [[f"{rng.choice([loc, viaf, yale])}{rng.randrange(300)}" for _ in range(rng.randint(1, 4))]
+              for _ in range(400)]
+    clusters = UriClusters()
+    for i, uris in enumerate(groups):
+        clusters.add_group(f"group {i}", uris)
+
+    # Reference components by repeatedly merging overlapping groups
+    components = []
+    for uris in groups:
+        merged = set(uris)
+        for component in [component for component in components if component & merged]:
+            merged |= component
+            components.remove(component)
+        components.append(merged)
+    assert sorted(map(sorted, clusters.components())) == sorted(map(sorted, components))
+
+    rows = mapping(clusters)
+    for component in components:
+        primaries = {rows[uri] for uri in component if uri in rows}
+        if len(component) == 1:
+            assert not primaries
+            continue
+        # Every other URI maps once, to one primary of the highest priority in its component
+        assert len(primaries) == 1
+        primary = primaries.pop()
+        assert set(uri for uri in component if uri in rows) == component - {primary}
+        assert get_priority_index(primary) == min(map(get_priority_index, component))
+
+    shuffled = UriClusters()
+    for i in rng.sample(range(len(groups)), len(groups)):
+        shuffled.add_group(f"group {i}", groups[i])
+    assert sorted(map(sorted, shuffled.components())) == sorted(map(sorted, components))
+
+
+def test_candidates_are_left_out_of_the_mapping():
+    record = {'name': "Helen Smith", 'equivalent': None, 'confidence': 0.5,
+              'entries': [{'name': "Smith, Helen", 'uri': 'a', 'equivalent': f"{viaf}1"},
+                          {'name': "Smith, H.", 'uri': 'b', 'equivalent': f"{loc}2", 'candidate': True}]}
+    assert record_uris(record) == [f"{viaf}1"]
@@ -0,0 +1,105 @@
+import io
+import gzip
+import pytest
+from src.visualize import (write_lines, render_tree, render_overlaps, write_tree, tree_to_string, open_output,
+                           create_tree, build_group_index, find_overlaps, format_overlap_record)
+from separate import write_overlap_records, output_names
+
+chunk_size = 4
+
+
+class CountingWriter(io.StringIO):
+
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        return super().write(text)
+
+
+@pytest.fixture(scope='module')
+def entries(synthetic_entries):
+    return synthetic_entries(1500, seed=11)
+
+
+@pytest.fixture(scope='module')
+def tree(entries):
+    return create_tree(build_group_index(entries))
+
+
+@pytest.mark.parametrize('count', [0, 1, chunk_size - 1, chunk_size, chunk_size + 1, 2 * chunk_size, 3 * chunk_size + 2])
+def test_write_lines_matches_join_at_chunk_boundaries(count):
+    lines = [f"line {i}" for i in range(count)]
+    f = CountingWriter()
+    assert write_lines(iter(lines), f, chunk_size=chunk_size) == count
+    assert f.getvalue() == "\n".join(lines)
+    assert f.writes == -(-count // chunk_size)
+
+
+def test_write_lines_keeps_empty_lines():
+    lines = ["", "a", "", "", "b", ""]
+    for size in range(1, len(lines) + 2):
+        f = io.StringIO()
+        write_lines(lines, f, chunk_size=size)
+        assert f.getvalue() == "\n".join(lines)
+
+
+@pytest.mark.parametrize('size', [1, chunk_size, 1000])
+def test_render_tree_matches_tree_to_string(tree, size):
+    f = io.StringIO()
+    lines = render_tree(tree, f, chunk_size=size)
+    assert f.getvalue() == tree_to_string(tree)
+    assert lines == tree_to_string(tree).count("\n") + 1
+
+
+@pytest.mark.parametrize('size', [1, chunk_size, 1000])
+def test_render_overlaps_matches_the_formatted_records(entries, size):
+    records = list(find_overlaps(build_group_index(entries)))
+    f = io.StringIO()
+    assert render_overlaps(iter(records), f, chunk_size=size) == len(records)
+    assert f.getvalue() == "\n".join(line for record in records for line in format_overlap_record(record))
+
+
+def test_write_tree_matches_tree_to_string(tree, tmp_path):
+    expected = tree_to_string(tree)
+    assert write_tree(tree, str(tmp_path / "tree.txt")) == expected.count("\n") + 1
+    assert (tmp_path / "tree.txt").read_text() == expected
+    # A rendered string is written as it is
+    write_tree(expected, str(tmp_path / "string.txt"))
+    assert (tmp_path / "string.txt").read_text() == expected
+
+
+def test_gzip_round_trips(tree, entries, tmp_path):
+    write_tree(tree, str(tmp_path / "tree.txt.gz"))
+    with gzip.open(str(tmp_path / "tree.txt.gz"), 'rt', encoding='utf-8') as f:
+        assert f.read() == tree_to_string(tree)
+
+    records = list(find_overlaps(build_group_index(entries)))
+    for compress in (False, True):
+        overlap_output, csv_output, jsonl_output = output_names(str(tmp_path / f"out{compress}.txt"), jsonl=True,
+                                                                compress=compress)
+        write_overlap_records(iter(records), overlap_output, csv_output, jsonl_output)
+    plain = output_names(str(tmp_path / "outFalse.txt"), jsonl=True)
+    compressed = output_names(str(tmp_path / "outTrue.txt"), jsonl=True, compress=True)
+    for plain_path, compressed_path in zip(plain, compressed):
+        with open(plain_path, encoding='utf-8') as f:
+            expected = f.read()
+        if compressed_path.endswith('.gz'):
+            with gzip.open(compressed_path, 'rt', encoding='utf-8') as f:
+                assert f.read() == expected
+        else:
+            # The mapping CSV is never compressed
+            with open(compressed_path, encoding='utf-8') as f:
+                assert f.read() == expected
+
+
+def test_open_output_follows_the_name_unless_told(tmp_path):
+    with open_output(str(tmp_path / "plain.gz"), compress=False, encoding='utf-8') as f:
+        f.write("Müller")
+    assert (tmp_path / "plain.gz").read_text(encoding='utf-8') == "Müller"
+    with open_output(str(tmp_path / "packed.txt"), compress=True) as f:
+        f.write("Müller")
+    with gzip.open(str(tmp_path / "packed.txt"), 'rt', encoding='utf-8') as f:
+        assert f.read() == "Müller"
@@ -0,0 +1,50 @@
+import numpy as np
+from src.clean import normalize_entry
+from src.score import entry_features, pairwise_similarity, group_confidence, _containment
+
+
+def person(name):
+    return normalize_entry({'name': name, 'type': 'person'})
+
+
+def containment(left, right):
+    features = entry_features([{'first_name': left}, {'first_name': right}])
+    return float(_containment(features, 'first', slice(0, 1))[0, 1])
+
+
+def test_prefix_is_contained():
+    assert containment('fred', 'frederick') == 1.0
+
+
+def test_containment_counts_real_bigrams():
+    # " a", "al", "lb", "be", "er", "rt" share "be", "er" and "rt" with "robert"
+    assert containment('albert', 'robert') == 0.5
+    assert containment('fred', 'xavier') == 0.0
+
+
+def test_exact_duplicates_score_one():
+    assert group_confidence([person("Adams, Fred"), person("Adams, Fred")]) == 1.0
+    assert group_confidence([person("Adams, Fred, 1921-1990"), person("Adams, Fred, 1921-1990")]) == 1.0
+
+
+def test_conflicting_dates_are_penalized():
+    same = group_confidence([person("Adams, Fred, 1921-1990"), person("Adams, Fred, 1921-1991")])
+    disjoint = group_confidence([person("Adams, Fred, 1821-1870"), person("Adams, Fred, 1921-1990")])
+    undated = group_confidence([person("Adams, Fred"), person("Adams, Fred, 1921-1990")])
+    assert same > undated > disjoint
+    assert disjoint < 0.25
+
+
+def test_batches_match_one_pass(monkeypatch):
+    entries = [person(name) for name in ("Adams, Fred", "Adams, F. L.", "Adams, Frederick L., 1900-1980",
+                                         "Adams, Fred (Painter)", "Adams, Fred, 1950-")]
+    expected = group_confidence(entries)
+    monkeypatch.setattr('src.score.batch_size', 2)
+    assert group_confidence(entries) == expected
+
+
+def test_similarity_is_symmetric():
+    entries = [person(name) for name in ("Adams, Fred", "Adams, F. L.", "Adair, Frederick L., 1900-1980")]
+    sim = pairwise_similarity(entry_features(entries))
+    assert np.allclose(sim, sim.T)
+    assert sim.min() >= 0 and sim.max() <= 1
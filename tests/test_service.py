@@ -0,0 +1,133 @@
+import json
+import time
+import threading
+import urllib.error
+import urllib.request
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import service as service_module
+from service import WarmCache, OverlapService, make_server
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_concurrent_misses_are_coalesced():
+    cache = WarmCache()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    with ThreadPoolExecutor(8) as executor:
+        first = executor.submit(cache.get, "key", compute)
+        started.wait(5)
+        others = [executor.submit(cache.get, "key", compute) for _ in range(7)]
+        # Every other caller is waiting on the computation in flight before it finishes
+        wait_for(lambda: cache.coalesced == 7)
+        release.set()
+        results = [first.result()] + [future.result() for future in others]
+    assert results == ["value"] * 8
+    assert len(calls) == 1
+    assert cache.stats()['misses'] == 1 and cache.stats()['coalesced'] == 7
+    assert cache.get("key", compute) == "value" and cache.hits == 1
+
+
+def test_failures_reach_every_waiter_and_are_not_cached():
+    cache = WarmCache()
+    started = threading.Event()
+    release = threading.Event()
+
+    def fail():
+        started.set()
+        release.wait(5)
+        raise LookupError("not cached")
+
+    with ThreadPoolExecutor(4) as executor:
+        first = executor.submit(cache.get, "key", fail)
+        started.wait(5)
+        others = [executor.submit(cache.get, "key", fail) for _ in range(3)]
+        wait_for(lambda: cache.coalesced == 3)
+        release.set()
+        for future in [first] + others:
+            with pytest.raises(LookupError):
+                future.result()
+    assert len(cache) == 0
+    assert cache.get("key", lambda: "value") == "value"
+    assert cache.misses == 2
+
+
+def test_entries_expire_and_are_evicted(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(service_module, 'time', SimpleNamespace(time=lambda: now[0]))
+    cache = WarmCache(maxsize=2, ttl=10)
+    for key in ("a", "b"):
+        cache.get(key, lambda: key.upper())
+    # Reading "a" makes "b" the least recently used
+    assert cache.get("a", lambda: "new") == "A"
+    cache.get("c", lambda: "C")
+    assert cache.evictions == 1
+    assert cache.get("b", lambda: "B again") == "B again"
+    now[0] += 11
+    assert cache.get("a", lambda: "A again") == "A again"
+
+
+@pytest.fixture
+def service(lux_stub, tmp_path):
+    service = OverlapService(workers=4, cache_dir=str(tmp_path / "cache"))
+    server = make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield service, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def get(url):
+    try:
+        with urllib.request.urlopen(url, timeout=30) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+@pytest.mark.lux_stub(count=500)
+def test_overlaps_against_the_stub(service):
+    service, url = service
+    with ThreadPoolExecutor(4) as executor:
+        responses = list(executor.map(get, [f"{url}/overlaps?q=fred"] * 4))
+    assert all(status == 200 for status, _ in responses)
+    bodies = [{k: v for k, v in body.items() if k != 'seconds'} for _, body in responses]
+    assert bodies[0]['entries'] and bodies[0]['groups']
+    assert all(body == bodies[0] for body in bodies)
+    stats = service.stats()
+    assert stats['indexes']['misses'] == 1 and stats['indexes']['coalesced'] + stats['indexes']['hits'] == 3
+    assert stats['entries']['misses'] == 1
+
+    status, fuzzy = get(f"{url}/overlaps?q=fred&fuzzy=1&min_confidence=0.9")
+    assert status == 200 and fuzzy['fuzzy'] is True
+    assert all(group['confidence'] >= 0.9 for group in fuzzy['groups'])
+    # The fuzzy grouping reuses the cleaned entries of the query
+    assert service.stats()['entries']['hits'] == 1
+
+
+@pytest.mark.lux_stub(count=50)
+def test_bad_requests(service):
+    service, url = service
+    assert get(f"{url}/overlaps")[0] == 400
+    assert get(f"{url}/overlaps?q=fred&min_confidence=high")[0] == 400
+    assert get(f"{url}/unknown")[0] == 404
+    service.offline = True
+    status, body = get(f"{url}/overlaps?q=nobody")
+    assert status == 404 and 'nobody' in body['error']
+    assert get(f"{url}/stats")[0] == 200
@@ -0,0 +1,57 @@
+import pytest
+from src.clean import normalize_entries
+from src.store import EntryStore
+from src.visualize import build_group_index
+from separate import write_outputs, process_query
+
+
+@pytest.fixture(scope='module')
+def entries(synthetic_entries):
+    entries = synthetic_entries(2000, seed=7)
+    entries += normalize_entries([{'name': 'Unbalanced (paren', 'type': 'person'},
+                                  {'name': 'Yale University', 'type': 'group'}])
+    return entries
+
+
+@pytest.fixture
+def store(entries, tmp_path):
+    EntryStore.from_entries(entries).save(str(tmp_path / "store"))
+    return EntryStore.load(str(tmp_path / "store"))
+
+
+def test_stored_entries_equal_the_cleaned_entries(entries, store):
+    assert len(store) == len(entries)
+    for entry, stored in zip(entries, store):
+        assert {field: stored[field] for field in entry if field in store.fields} == \
+            {field: entry[field] for field in entry if field in store.fields}
+
+
+def test_store_groups_like_the_dict_path(entries, store):
+    expected = {key: [entry['uri'] for entry in group] for key, group in build_group_index(entries).items()}
+    grouped = {key: [entry['uri'] for entry in group] for key, group in build_group_index(store).items()}
+    assert list(grouped.items()) == list(expected.items())
+
+
+@pytest.mark.parametrize('fuzzy', [False, True])
+def test_store_outputs_equal_the_dict_outputs(entries, store, tmp_path, fuzzy):
+    write_outputs(entries, str(tmp_path / "dicts.txt"), fuzzy=fuzzy, jsonl=True)
+    write_outputs(store, str(tmp_path / "store.txt"), fuzzy=fuzzy, jsonl=True)
+    for suffix in ("_overlap.txt", "_mapping.csv", "_overlap.jsonl"):
+        assert (tmp_path / f"store{suffix}").read_text() == (tmp_path / f"dicts{suffix}").read_text()
+
+
+@pytest.mark.lux_stub(count=600)
+def test_store_is_only_used_for_its_own_query(lux_stub, tmp_path):
+    store_dir, cache_dir = str(tmp_path / "store"), str(tmp_path / "cache")
+    process_query("fred", str(tmp_path / "fred.txt"), entry_store=store_dir, cache_dir=cache_dir)
+    # Same query, other spelling: the store is reused and the outputs are the same
+    lux_stub.lux.requests = 0
+    process_query("Fred ", str(tmp_path / "fred_again.txt"), entry_store=store_dir, cache_dir=None)
+    assert lux_stub.lux.requests == 0
+    process_query("smith", str(tmp_path / "smith.txt"), entry_store=store_dir, cache_dir=cache_dir)
+    process_query("smith", str(tmp_path / "smith_direct.txt"), cache_dir=cache_dir)
+    for suffix in ("_overlap.txt", "_mapping.csv"):
+        assert (tmp_path / f"fred_again{suffix}").read_text() == (tmp_path / f"fred{suffix}").read_text()
+        assert (tmp_path / f"smith{suffix}").read_text() == (tmp_path / f"smith_direct{suffix}").read_text()
+    assert "Smith" in (tmp_path / "smith_overlap.txt").read_text()
+    assert EntryStore.matches(store_dir, {'query': 'smith', 'filters': {'recordType': 'person'}})
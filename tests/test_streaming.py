@@ -0,0 +1,53 @@
+import random
+import pytest
+from src import visualize
+from src.visualize import build_group_index, build_fuzzy_index, split_life_spans, iter_overlap_groups, \
+    iter_streamed_overlaps
+
+
+@pytest.fixture(scope='module')
+def entries(synthetic_entries):
+    entries = synthetic_entries(3000, seed=1)
+    random.Random(0).shuffle(entries)
+    return entries
+
+
+def names(groups):
+    return [(tuple(key), [entry['name'] for entry in group]) for key, group in groups]
+
+
+@pytest.mark.parametrize('fuzzy', [False, True])
+@pytest.mark.parametrize('buffer_size', [None, 100])
+def test_unsorted_stream_matches_full_grouping(entries, tmp_path, fuzzy, buffer_size):
+    index = build_fuzzy_index(entries) if fuzzy else build_group_index(entries)
+    expected = names(iter_overlap_groups(split_life_spans(index)))
+    streamed = names(iter_streamed_overlaps(entries, fuzzy=fuzzy, buffer_size=buffer_size, spill_dir=str(tmp_path)))
+    assert len(expected) > 100
+    assert streamed == expected
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_stream_without_dates(entries):
+    expected = names(iter_overlap_groups(build_group_index(entries)))
+    assert names(iter_streamed_overlaps(iter(entries), consider_dates=False, buffer_size=50)) == expected
+
+
+@pytest.mark.parametrize('fuzzy', [False, True])
+def test_stream_groups_at_most_a_buffer_at_a_time(entries, tmp_path, monkeypatch, fuzzy):
+    grouped = []
+    iter_index_groups = visualize._iter_index_groups
+
+    def recorded(bucket, *args):
+        grouped.append(bucket)
+        return iter_index_groups(bucket, *args)
+
+    monkeypatch.setattr(visualize, '_iter_index_groups', recorded)
+    index = build_fuzzy_index(entries) if fuzzy else build_group_index(entries)
+    expected = names(iter_overlap_groups(split_life_spans(index)))
+    streamed = names(iter_streamed_overlaps(entries, fuzzy=fuzzy, buffer_size=40, spill_dir=str(tmp_path)))
+    assert streamed == expected
+    assert len(grouped) > visualize.stream_buckets
+    for bucket in grouped:
+        # Only entries sharing one surname key may exceed the buffer
+        assert len(bucket) <= 40 or len({visualize._partition_key(entry, fuzzy) for entry in bucket}) == 1
+    assert sum(len(bucket) for bucket in grouped) == sum(len(group) for group in build_group_index(entries).values())
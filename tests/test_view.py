@@ -0,0 +1,170 @@
+"""
+Tests of the combined materialized view, and of the server-side cursors reading it, against a real
+PostgreSQL server. They only run when LUX_TEST_DSN is set to the DSN of a disposable database with
+the pg_trgm extension available, e.g. LUX_TEST_DSN="postgresql://postgres@localhost/lux_test". The
+view person_records_all is dropped and recreated there, from record cache tables created for the tests.
+"""
+import os
+import json
+import threading
+import pytest
+from src import download
+from src.clean import normalize_entry
+
+dsn = os.environ.get('LUX_TEST_DSN')
+pytestmark = pytest.mark.skipif(not dsn, reason="LUX_TEST_DSN is not set")
+
+caches = ['luxtest_a', 'luxtest_b']
+
+names = [
+    "Adair, Fred Lyman, 1877-1972",
+    "Fred Lyman Adair",
+    "Adair, F.L.",
+    "Adair, F. L. (Fred Lyman)",
+    "Adams, Fred, 1921-",
+    "Adams, Fred, 1961-",
+    "[Tolkien, J. R. R.]",
+    "Tolkien, J.R.R. (John Ronald Reuel), 1892-1973",
+    "Dr. Mary Jones",
+    "O'Keeffe, Georgia, 1887-1986",
+    "Hokusai",
+]
+
+
+def person(uri, *person_names):
+    return {
+        "id": uri,
+        "type": "Person",
+        "identified_by": [{"type": "Name", "content": name, "classified_as": [{"id": download.primary_name_id}]}
+                          for name in person_names],
+    }
+
+
+def execute(sql_query, params=None):
+    with download.pooled_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql_query, params)
+            return cur.fetchall() if cur.description else None
+
+
+def insert(cache, identifier, record):
+    execute(f"INSERT INTO {cache}_record_cache (identifier, data) VALUES (%s, %s)", (identifier, json.dumps(record)))
+
+
+@pytest.fixture(scope='module')
+def view():
+    saved = download._db_config
+    download.close_pool()
+    download.set_db_config({'dsn': dsn})
+    for cache in caches:
+        execute(f"DROP TABLE IF EXISTS {cache}_record_cache; "
+                f"CREATE TABLE {cache}_record_cache (identifier text PRIMARY KEY, data jsonb)")
+    for i, name in enumerate(names):
+        insert(caches[i % 2], f"r{i}", person(f"https://lux.example/data/person/{i}", name))
+    # A record with two primary names
+    insert(caches[0], "multi", person("https://lux.example/data/person/multi", "Adair, Fred", "Fred Adair"))
+    download.create_combined_materialized_view(caches, rebuild=True)
+    yield
+    execute("DROP MATERIALIZED VIEW IF EXISTS public.person_records_all")
+    for cache in caches:
+        execute(f"DROP TABLE IF EXISTS {cache}_record_cache")
+    download.close_pool()
+    download.set_db_config(saved)
+
+
+def python_name_key(name):
+    """
+    The lux_name_key of a name computed from the Python cleaning rules: the first, middle and last
+    names, lowercased, and the first parenthetical.
+    """
+    entry = normalize_entry({'name': name, 'type': 'person'})
+    parentheticals = entry['parentheticals']
+    clean_name = ' '.join(f"{entry['first_name']} {entry['middle_name']} {entry['last_name']}".split()).lower()
+    return f"{clean_name}|{parentheticals[0].lower() if parentheticals else ''}"
+
+
+def test_view_is_current(view):
+    assert download.materialized_view_exists('person_records_all')
+    assert download.view_is_current()
+    rows = execute("SELECT count(*), count(DISTINCT record_id) FROM person_records_all")
+    assert rows == [(len(names) + 2, len(names) + 1)]
+
+
+def test_refresh_concurrently(view):
+    insert(caches[1], "late", person("https://lux.example/data/person/late", "Adair, Frederick L."))
+    counts = []
+
+    def read():
+        for _ in range(10):
+            counts.append(execute("SELECT count(*) FROM person_records_all")[0][0])
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    download.refresh_combined_materialized_view()
+    reader.join()
+    # Readers see the view before or after the refresh, never an empty one
+    assert set(counts) <= {len(names) + 2, len(names) + 3}
+    assert execute("SELECT name FROM person_records_all WHERE record_id = 'late'") == [("Adair, Frederick L.",)]
+    assert download.view_is_current()
+
+
+@pytest.mark.parametrize('name', names + [
+    # The key only approximates the Python grouping, which reads "John" as the surname here
+    pytest.param("Smith, John, Jr.", marks=pytest.mark.xfail(strict=True)),
+])
+def test_name_key_matches_python(view, name):
+    assert execute("SELECT public.lux_name_key(%s)", (name,))[0][0] == python_name_key(name)
+
+
+
+def test_candidate_shards_match_full_shards(view):
+    from corpus import process_shard
+
+    def shard_records(full_shard):
+        records = [record for shard in range(3) for record in process_shard(shard, 3, full_shard=full_shard)[0]]
+        return sorted(json.dumps(record, sort_keys=True) for record in records)
+
+    candidates = shard_records(full_shard=False)
+    assert candidates and candidates == shard_records(full_shard=True)
+    # The record with two primary names does not overlap with itself
+    assert not any(all(entry['uri'].endswith('/multi') for entry in json.loads(record)['entries'])
+                   for record in candidates)
+
+
+def test_shard_hash_handles_the_smallest_integer(view):
+    # abs() of the int4 hash would overflow on -2147483648, so it is cast to bigint first
+    condition = download.shard_condition.replace("hashtext(coalesce(surname_key, ''))", "cast(%s AS int)")
+    assert execute(f"SELECT {condition}", (-2147483648, 7, 2147483648 % 7)) == [(True,)]
+    shards = [row for shard in range(3) for row in download.fetch_shard(shard, 3)]
+    assert len(shards) == execute("SELECT count(*) FROM person_records_all")[0][0]
+
+
+def used_connections():
+    return len(download.get_pool()._used)
+
+
+def test_stream_query_reads_in_batches(view):
+    assert [row[0] for row in download.stream_query("SELECT g FROM generate_series(1, 25) g", batch_size=4)] == \
+        list(range(1, 26))
+    assert used_connections() == 0
+
+
+def test_closed_stream_returns_its_connection(view):
+    rows = download.stream_query("SELECT g FROM generate_series(1, 1000) g", batch_size=3)
+    assert [next(rows)[0] for _ in range(5)] == [1, 2, 3, 4, 5]
+    assert used_connections() == 1
+    rows.close()
+    assert used_connections() == 0
+    # The connection was rolled back and is usable again
+    assert execute("SELECT 1") == [(1,)]
+    assert used_connections() == 0
+
+
+def test_fetch_combined_data_streams_matching_names(view):
+    expected = [name for name, in execute("SELECT name FROM person_records_all WHERE name ILIKE '%%adair%%'")]
+    assert len(expected) > 4
+    assert sorted(download.fetch_combined_data("adair", batch_size=2)) == sorted(expected)
+    matches = download.fetch_combined_data("adair", batch_size=2)
+    next(matches)
+    matches.close()
+    assert used_connections() == 0